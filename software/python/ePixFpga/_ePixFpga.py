@@ -31,6 +31,7 @@ from surf.devices.micron._AxiMicronN25Q import *
 import surf
 import numpy as np
 import time
+import threading
 
 try:
     from PyQt5.QtWidgets import *
@@ -6452,6 +6453,102 @@ class MicroblazeLog(pr.Device):
         # A command can also be a call to a local function with local scope.
         # The command object and the arg are passed
 
+        # Tail state: write pointer of the last read and the last incomplete line
+        self._tailPointer = None
+        self._tailPartial = b''
+        self._tailLock = threading.Lock()
+        self._tailThread = None
+        self._tailStop = threading.Event()
+
+    # Data bytes following the MemInfo word
+    bufferSize = 4092
+
+    def _readBytes(self, start, count):
+        """count log bytes from buffer position start, read as whole words"""
+        first = start & ~0x3
+        numWords = (start + count - first + 3) // 4
+        words = self._rawRead(offset=4 + first, numWords=numWords)
+        if numWords == 1:
+            words = [words]
+        data = np.array(words, dtype='<u4').tobytes()
+        return data[start - first:start - first + count]
+
+    def readNew(self, fromStart=False):
+        """bytes written since the previous call, the first call returns the buffer
+           content when fromStart is set and nothing otherwise. The MemPointer and
+           MemLength are read in one word. More than bufferSize bytes written between
+           two calls are lost."""
+        info = self._rawRead(offset=0)
+        pointer = (info & 0xFFFF) % self.bufferSize
+        length = min((info >> 16) & 0xFFFF, self.bufferSize)
+
+        with self._tailLock:
+            last = self._tailPointer
+            self._tailPointer = pointer
+            if last is None:
+                if not fromStart:
+                    return b''
+                # oldest byte is at the write pointer once the buffer has wrapped
+                count = length
+            else:
+                count = (pointer - last) % self.bufferSize
+            if count == 0:
+                return b''
+
+            start = (pointer - count) % self.bufferSize
+            if start + count <= self.bufferSize:
+                return self._readBytes(start, count)
+            # wrapped: end of the buffer then its beginning
+            return self._readBytes(start, self.bufferSize - start) + self._readBytes(0, start + count - self.bufferSize)
+
+    def tail(self, logger=None, stream=None, fromStart=False):
+        """complete new log lines, each also sent to logger.info() and written to stream"""
+        data = self.readNew(fromStart)
+        if not data:
+            return []
+        with self._tailLock:
+            data = self._tailPartial + data.replace(b'\x00', b'')
+            *lines, self._tailPartial = data.split(b'\n')
+        lines = [line.decode(errors='replace').rstrip('\r') for line in lines]
+        for line in lines:
+            if logger is not None:
+                logger.info(line)
+            if stream is not None:
+                stream.write(line + '\n')
+        if stream is not None:
+            stream.flush()
+        return lines
+
+    def startTail(self, period=1.0, logger=None, filename=None, fromStart=True):
+        """polls the log every period seconds from a thread, lines go to logger and/or
+           are appended to filename"""
+        self.stopTail()
+        self._tailStop.clear()
+        stream = open(filename, 'a') if filename is not None else None
+
+        def run():
+            try:
+                first = fromStart
+                while not self._tailStop.is_set():
+                    try:
+                        self.tail(logger=logger, stream=stream, fromStart=first)
+                        first = False
+                    except Exception as e:
+                        print('MicroblazeLog tail: %s' % e)
+                    self._tailStop.wait(period)
+            finally:
+                if stream is not None:
+                    stream.close()
+
+        self._tailThread = threading.Thread(target=run, name=f'{self.path}.tail', daemon=True)
+        self._tailThread.start()
+
+    def stopTail(self):
+        if self._tailThread is not None:
+            self._tailStop.set()
+            self._tailThread.join()
+            self._tailThread = None
+
     @staticmethod
     def frequencyConverter(self):
         def func(dev, var):
@@ -6520,6 +6617,10 @@ class Epix10kADouts(pr.Device):
 
 
 class WaveformMemoryDevice(pr.MemoryDevice):
+
+    # samples of the high speed DAC waveform, one per 32 bit word
+    waveformSize = 1024
+
     def __init__(self, **kwargs):
         if 'description' not in kwargs:
             kwargs['description'] = "Waveform memory device"
@@ -6541,18 +6642,34 @@ class WaveformMemoryDevice(pr.MemoryDevice):
         """SetTestBitmap command function"""
         self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
         if os.path.splitext(self.filename)[1] == '.csv':
-            waveform = np.genfromtxt(self.filename, delimiter=',', dtype='uint16')
-            if waveform.shape == (1024,):
-                for x in range(0, 1024):
-                    self._rawWrite(offset=(x * 4), data=int(waveform[x]))
-            else:
-                print('wrong csv file format')
+            try:
+                self.loadWaveformCsv(self.filename)
+            except ValueError as e:
+                print('wrong csv file format: %s' % e)
 
     def fnGetWaveform(self, dev, cmd, arg):
         """GetTestBitmap command function"""
         self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
         if os.path.splitext(self.filename)[1] == '.csv':
-            readBack = np.zeros((1024), dtype='uint16')
-            for x in range(0, 1024):
-                readBack[x] = self._rawRead(offset=(x * 4))
-            np.savetxt(self.filename, readBack, fmt='%d', delimiter=',', newline='\n')
+            self.saveWaveformCsv(self.filename)
+
+    def setWaveform(self, waveform):
+        """writes the waveformSize samples of waveform as one block transaction"""
+        waveform = np.asarray(waveform)
+        if waveform.shape != (self.waveformSize,):
+            raise ValueError('expected %d samples, got shape %s' % (self.waveformSize, waveform.shape))
+        if np.any(waveform < 0) or np.any(waveform > 0xFFFF):
+            raise ValueError('samples out of the 16 bit range')
+        # one sample per 32 bit word, the list is packed and sent in one block
+        self._rawWrite(offset=0, data=waveform.astype(np.uint32).tolist())
+
+    def getWaveform(self):
+        """reads the waveform back as one block transaction, uint16 array"""
+        readBack = np.array(self._rawRead(offset=0, numWords=self.waveformSize), dtype='uint32')
+        return (readBack & 0xFFFF).astype('uint16')
+
+    def loadWaveformCsv(self, filename):
+        self.setWaveform(np.genfromtxt(filename, delimiter=',', dtype='uint16'))
+
+    def saveWaveformCsv(self, filename):
+        np.savetxt(filename, self.getWaveform(), fmt='%d', delimiter=',', newline='\n')
@@ -0,0 +1,344 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue ePixQuad register space emulator
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# In-process stand-in for the SRPv3 register space of the ePixQuad firmware.
+# Registers are plain memory except for the handshakes the software relies
+# on: acquisition and sequence counters, the SACI matrix configuration done
+# flag, the ADC startup test, the AdcTester pass / fail result and the
+# Ad9249 readout frame lock, which follow per lane data eyes.
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.memory as rim
+import rogue.interfaces.stream as ris
+import pyrogue as pr
+import numpy as np
+import bisect
+import collections
+import threading
+import time
+
+# Absolute register addresses, see the device offsets in Top
+ACQ_COUNT          = 0x01000000
+ACQ_COUNT_RESET    = 0x01000004
+SEQ_COUNT          = 0x01100004
+SEQ_COUNT_RESET    = 0x01100008
+ADC_REQ_START      = 0x00100504
+ADC_REQ_TEST       = 0x00100508
+ADC_TEST_DONE      = 0x0010050C
+ADC_TEST_FAILED    = 0x00100510
+ADC_CHANNEL_FAIL   = 0x00100514
+CONF_WR_REQ        = 0x08800000
+CONF_RD_REQ        = 0x08800004
+CONF_DONE_ALL      = 0x0880000C
+CONF_FAIL          = 0x08800010
+TESTER_CHANNEL     = 0x02D00000
+TESTER_REQUEST     = 0x02D00014
+TESTER_PASSED      = 0x02D00018
+TESTER_FAILED      = 0x02D0001C
+READOUT_BASE       = 0x02000000
+READOUT_STRIDE     = 0x00100000
+
+# Ad9249ReadoutGroup (ultrascale) register layout
+READOUT_CHANNEL_DELAY = 0x00
+READOUT_FRAME_DELAY   = 0x20
+READOUT_LOCK_STATUS   = 0x30
+READOUT_LOCK_RESET    = 0x38
+
+NUM_ADCS = 10
+NUM_LANES = 8
+NUM_TAPS = 512
+
+
+class EpixQuadEmulator(rim.Slave):
+    """Memory slave emulating the ePixQuad register space with a configurable round trip latency"""
+
+    pageSize = 4096
+
+    def __init__(self, latency=0.0, confTime=0.0, eyeWidth=(80, 160), edgeJitter=2.0, seed=None):
+        rim.Slave.__init__(self, 4, 0xFFFFFFFF)
+
+        # latency in seconds between a request and its completion,
+        # requests are pipelined so concurrent transactions overlap
+        self.latency = latency
+
+        # time the SACI matrix configuration keeps ConfDoneAll low
+        self.confTime = confTime
+
+        self._pages = {}
+        self._lock = threading.RLock()
+        self._log = pr.logInit(cls=self, name='EpixQuadEmulator')
+
+        self._pending = collections.deque()
+        self._pendingCond = threading.Condition()
+        self._worker = None
+
+        self._confDone = 0.0
+        self._lostLock = [0] * NUM_ADCS
+        self._rng = np.random.default_rng(seed)
+        self.edgeJitter = edgeJitter
+        self.randomizeEyes(eyeWidth)
+
+        # word address -> (write hook, read hook)
+        self._hooks = {}
+        self._addHook(ACQ_COUNT_RESET, wr=lambda v: self._counterReset(ACQ_COUNT, v))
+        self._addHook(SEQ_COUNT_RESET, wr=lambda v: self._counterReset(SEQ_COUNT, v))
+        self._addHook(ADC_REQ_START, wr=self._adcStartup)
+        self._addHook(ADC_REQ_TEST, wr=self._adcStartup)
+        self._addHook(CONF_WR_REQ, wr=self._confRequest)
+        self._addHook(CONF_RD_REQ, wr=self._confRequest)
+        self._addHook(CONF_DONE_ALL, rd=lambda: int(time.monotonic() >= self._confDone))
+        self._addHook(TESTER_REQUEST, wr=self._testRequest)
+        for adc in range(NUM_ADCS):
+            base = READOUT_BASE + adc * READOUT_STRIDE
+            for lane in range(NUM_LANES):
+                self._addHook(base + READOUT_CHANNEL_DELAY + lane * 4, wr=self._delayWrite(base + READOUT_CHANNEL_DELAY + lane * 4))
+            self._addHook(base + READOUT_FRAME_DELAY, wr=self._delayWrite(base + READOUT_FRAME_DELAY))
+            self._addHook(base + READOUT_LOCK_STATUS, rd=lambda adc=adc: self._lockStatus(adc))
+            self._addHook(base + READOUT_LOCK_RESET, wr=lambda v, adc=adc: self._lockReset(adc, v))
+        self._hookAddrs = sorted(self._hooks)
+
+    def randomizeEyes(self, eyeWidth=(80, 160), seed=None):
+        """draws new frame and data lane eyes, [adc, 0] is the frame eye and [adc, 1 + lane] the data lanes"""
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+        width = self._rng.uniform(eyeWidth[0], eyeWidth[1], (NUM_ADCS, NUM_LANES + 1))
+        self.eyeCenter = self._rng.uniform(width / 2, NUM_TAPS - width / 2)
+        self.eyeWidth = width
+
+    def inEye(self, adc, index, delay):
+        """True if the delay samples inside the eye, the edges are blurred by a gaussian jitter"""
+        margin = self.eyeWidth[adc, index] / 2 - abs(delay - self.eyeCenter[adc, index])
+        if self.edgeJitter > 0:
+            margin += self._rng.normal(0.0, self.edgeJitter)
+        return margin > 0
+
+    ##########################
+    # Register memory
+    ##########################
+
+    def read(self, address, size):
+        """bytes of the emulated memory, without side effects"""
+        with self._lock:
+            return self._access(address, size).tobytes()
+
+    def write(self, address, data):
+        """writes the emulated memory, without side effects"""
+        with self._lock:
+            data = np.frombuffer(bytes(data), dtype=np.uint8)
+            self._access(address, len(data), data)
+
+    def readWord(self, address):
+        return int.from_bytes(self.read(address, 4), 'little')
+
+    def writeWord(self, address, value):
+        self.write(address, (value & 0xFFFFFFFF).to_bytes(4, 'little'))
+
+    def _access(self, address, size, data=None):
+        out = np.empty(size, dtype=np.uint8) if data is None else None
+        pos = 0
+        while pos < size:
+            page, offset = divmod(address + pos, self.pageSize)
+            n = min(size - pos, self.pageSize - offset)
+            mem = self._pages.get(page)
+            if data is not None:
+                if mem is None:
+                    mem = self._pages[page] = np.zeros(self.pageSize, dtype=np.uint8)
+                mem[offset:offset + n] = data[pos:pos + n]
+            elif mem is None:
+                out[pos:pos + n] = 0
+            else:
+                out[pos:pos + n] = mem[offset:offset + n]
+            pos += n
+        return out
+
+    ##########################
+    # Transactions
+    ##########################
+
+    def _doTransaction(self, transaction):
+        with transaction.lock():
+            address = transaction.address()
+            size = transaction.size()
+            ttype = transaction.type()
+
+            # write data is captured at request time, as in the SRP request frame
+            data = None
+            if ttype == rim.Write or ttype == rim.Post:
+                data = bytearray(size)
+                transaction.getData(data, 0)
+
+            # posted writes complete without waiting for the response
+            if ttype == rim.Post:
+                transaction.done()
+                transaction = None
+
+        request = (transaction, address, size, data)
+        if self.latency <= 0:
+            self._complete(*request)
+            return
+
+        with self._pendingCond:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='EpixQuadEmulator', daemon=True)
+                self._worker.start()
+            # constant latency keeps the queue sorted by due time
+            self._pending.append((time.monotonic() + self.latency, request))
+            self._pendingCond.notify()
+
+    def _run(self):
+        while True:
+            with self._pendingCond:
+                while not self._pending:
+                    self._pendingCond.wait()
+                due, request = self._pending.popleft()
+
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._complete(*request)
+
+    def _complete(self, transaction, address, size, data):
+        # requests are applied in order, like the firmware register bus
+        with self._lock:
+            if data is not None:
+                self._access(address, size, np.frombuffer(data, dtype=np.uint8))
+                for addr in self._hooksIn(address, size):
+                    wr = self._hooks[addr][0]
+                    if wr is not None:
+                        wr(self.readWord(addr))
+            else:
+                for addr in self._hooksIn(address, size):
+                    rd = self._hooks[addr][1]
+                    if rd is not None:
+                        self.writeWord(addr, rd())
+                readData = bytearray(self._access(address, size).tobytes())
+
+        if transaction is None:
+            return
+
+        with transaction.lock():
+            if transaction.expired():
+                return
+            if data is None:
+                transaction.setData(readData, 0)
+            transaction.done()
+
+    def _hooksIn(self, address, size):
+        lo = bisect.bisect_left(self._hookAddrs, address & ~0x3)
+        hi = bisect.bisect_left(self._hookAddrs, address + size)
+        return self._hookAddrs[lo:hi]
+
+    def _addHook(self, address, wr=None, rd=None):
+        self._hooks[address] = (wr, rd)
+
+    ##########################
+    # Firmware behaviour
+    ##########################
+
+    def trigger(self):
+        """one acquisition, increments the acquisition and sequence counters"""
+        with self._lock:
+            acqNum = self.readWord(ACQ_COUNT)
+            seqNum = self.readWord(SEQ_COUNT)
+            self.writeWord(ACQ_COUNT, acqNum + 1)
+            self.writeWord(SEQ_COUNT, seqNum + 1)
+        return acqNum, seqNum
+
+    def _counterReset(self, address, value):
+        if value & 0x1:
+            self.writeWord(address, 0)
+
+    def _confRequest(self, value):
+        if value & 0x1:
+            self._confDone = time.monotonic() + self.confTime
+            self.writeWord(CONF_DONE_ALL, 0)
+            self.writeWord(CONF_FAIL, 0)
+
+    def _delayWrite(self, address):
+        # bit 9 loads the delay, the read back value is the tap count
+        return lambda value: self.writeWord(address, value & (NUM_TAPS - 1))
+
+    def _channelDelay(self, adc, lane):
+        return self.readWord(READOUT_BASE + adc * READOUT_STRIDE + READOUT_CHANNEL_DELAY + lane * 4)
+
+    def _frameDelay(self, adc):
+        return self.readWord(READOUT_BASE + adc * READOUT_STRIDE + READOUT_FRAME_DELAY)
+
+    def _lockStatus(self, adc):
+        # LostLockCount in bits 15:0, Locked in bit 16
+        if self.inEye(adc, 0, self._frameDelay(adc)):
+            return (1 << 16) | self._lostLock[adc]
+        self._lostLock[adc] = min(self._lostLock[adc] + 1, 0xFFFF)
+        return self._lostLock[adc]
+
+    def _lockReset(self, adc, value):
+        if value & 0x1:
+            self._lostLock[adc] = 0
+
+    def _testRequest(self, value):
+        if value & 0x1:
+            channel = self.readWord(TESTER_CHANNEL)
+            adc, lane = divmod(channel, NUM_LANES)
+            passed = adc < NUM_ADCS and self.inEye(adc, 1 + lane, self._channelDelay(adc, lane))
+            self.writeWord(TESTER_PASSED, int(passed))
+            self.writeWord(TESTER_FAILED, int(not passed))
+
+    def _adcStartup(self, value):
+        if value & 0x1:
+            failed = 0
+            for adc in range(NUM_ADCS):
+                mask = 0
+                for lane in range(NUM_LANES):
+                    if not self.inEye(adc, 1 + lane, self._channelDelay(adc, lane)):
+                        mask |= 1 << lane
+                if not self.inEye(adc, 0, self._frameDelay(adc)):
+                    mask |= 1 << NUM_LANES
+                self.writeWord(ADC_CHANNEL_FAIL + adc * 4, mask)
+                failed |= mask
+            self.writeWord(ADC_TEST_DONE, 1)
+            self.writeWord(ADC_TEST_FAILED, int(failed != 0))
+
+
+class EpixQuadEmulatorStream(ris.Slave, ris.Master):
+    """Emulated PGP virtual channel, a command frame from software is an acquisition trigger"""
+
+    def __init__(self, emulator=None, frameSource=None):
+        ris.Slave.__init__(self)
+        ris.Master.__init__(self)
+        self._emulator = emulator
+
+        # frameSource(acqNum, seqNum) returns the data frame bytes sent for a trigger
+        self.frameSource = frameSource
+        self.rxCount = 0
+
+    def _acceptFrame(self, frame):
+        self.rxCount += 1
+        if self._emulator is None:
+            return
+        acqNum, seqNum = self._emulator.trigger()
+        if self.frameSource is not None:
+            self.sendData(self.frameSource(acqNum, seqNum))
+
+    def sendData(self, data):
+        """sends data downstream as if it came from the camera"""
+        frame = self._reqFrame(len(data), True)
+        frame.write(bytearray(data), 0)
+        self._sendFrame(frame)
+
+    # source >> destination
+    def __rshift__(self,other):
+        pr.streamConnect(self,other)
+        return other
+
+    # destination << source
+    def __lshift__(self,other):
+        pr.streamConnect(other,self)
+        return other
@@ -20,99 +20,26 @@
 import pyrogue as pr
 #import collections
 import numpy as np
+import threading
 
 
 class EpixQuadMonitor(pr.Device):
-    def __init__(self, **kwargs):
+
+    # Register windows (name, offset, words) covering the raw monitoring registers
+    windows = (
+        ('StatusWindow', 0x0000_000C, 7),
+        ('AD7949Window', 0x0000_0100, 8),
+        ('SensorRegWindow', 0x0000_0200, 26),
+    )
+
+    def __init__(self, pollInterval=0, **kwargs):
         """Create the configuration device for Monitoring Core data readout"""
         super().__init__(description='Temperature Sensors Registers', **kwargs)
 
-        def getPwrCurr(var):
-            x = var.dependencies[0].value()
-            return x * 0.1024 / 4095 / 0.02
-
-        def getPwrVin(var):
-            x = var.dependencies[0].value()
-            return x * 102.4 / 4095
-
-        def getPwrTemp(var):
-            x = var.dependencies[0].value()
-            a = 130.0 / (0.882 - 1.951)
-            b = (0.882 / 0.0082) + 100
-            return x * 2.048 / 4095 * a + b
-
-        def getShtHum(var):
-            x = var.dependencies[0].value()
-            return x / 65535.0 * 100.0
-
-        def getShtTemp(var):
-            x = var.dependencies[0].value()
-            return x / 65535.0 * 175.0 - 45.0
-
-        def getNctTemp(var):
-            x = var.dependencies[0].value()
-            y = var.dependencies[1].value()
-            return x * 1.0 + (y >> 6) * 0.25
-
-        def getNctTempLoc(var):
-            x = var.dependencies[0].value()
-            return x * 1.0
-
-        def getLt3086DoubleCurr(var):
-            x = var.dependencies[0].value()
-            # Imon = Iin / 1000
-            # Rload = 330 ohm
-            # ADC buffer gain x 2
-            # Two parallel LDOs current x 2
-            # returns current in A
-            return x / 16383.0 * 2.5 / 330.0 * 1000
-
-        def getLt3086SingleCurr(var):
-            x = var.dependencies[0].value()
-            # Imon = Iin / 1000
-            # Rload = 330 ohm
-            # ADC buffer gain x 2
-            # One LDO current x 1
-            # returns current in mA
-            return x / 16383.0 * 2.5 / 330.0 * 1000000 / 2.0
-
-        def getThermistorTemp(var):
-            # resistor divider 100k and MC65F103B (Rt25=10k)
-            # Vref 2.5V
-            TthermK = 0.0
-            x = var.dependencies[0].value()
-            if x != 0:
-                Umeas = x / 16383.0 * 2.5
-                Itherm = Umeas / 100000
-                Rtherm = (2.5 - Umeas) / Itherm
-                if Rtherm > 0.0:
-                    LnRtR25 = np.log(Rtherm / 10000.0)
-                    TthermK = 1.0 / (3.3538646E-03 + 2.5654090E-04 * LnRtR25 +
-                                     1.9243889E-06 * (LnRtR25**2) + 1.0969244E-07 * (LnRtR25**3))
-                TthermK -= 273.15
-            return TthermK
-
-        def getAnaTemp(var):
-            x = var.dependencies[0].value()
-            a = 130.0 / (0.882 - 1.951)
-            b = (0.882 / 0.0082) + 100
-            return x * 1.65 / 65535 * a + b
-
-        def getLdoTemp(var):
-            x = var.dependencies[0].value()
-            return x * 1.65 / 65535 * 100
-
-        def getTrOptTemp(var):
-            x = var.dependencies[0].value()
-            return x * 1.0 / 256
-
-        def getTrOptVolt(var):
-            x = var.dependencies[0].value()
-            return x * 0.0001
-
-        def getTrOptPwr(var):
-            x = var.dependencies[0].value()
-            return x * 0.1
+        # Converted values of the last window contents, see derivedValues()
+        self._derivedLock = threading.Lock()
+        self._derivedRaw = None
+        self._derived = {}
 
         # Creation. memBase is either the register bus server (srp, rce mapped memory, etc) or the device which
         # contains this object. In most cases the parent and memBase are the same but they can be
@@ -162,7 +89,8 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=16,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'
+                  mode='RO',
+                  overlapEn=True
                   ))
 
         self.add(pr.RemoteVariable
@@ -172,14 +100,15 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=16,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'
+                  mode='RO',
+                  overlapEn=True
                   ))
 
         self.add(pr.LinkVariable
                  (name='ShtHum',
                   mode='RO',
                   units='%',
-                  linkedGet=getShtHum,
+                  linkedGet=self._linkedGet,
                   disp='{:1.2f}',
                   dependencies=[self.ShtHumRaw]
                   ))
@@ -191,13 +120,14 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=16,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'))
+                  mode='RO',
+                  overlapEn=True))
 
         self.add(pr.LinkVariable
                  (name='ShtTemp',
                   mode='RO',
                   units='deg C',
-                  linkedGet=getShtTemp,
+                  linkedGet=self._linkedGet,
                   disp='{:1.2f}',
                   dependencies=[self.ShtTempRaw]
                   ))
@@ -209,7 +139,8 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=16,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'
+                  mode='RO',
+                  overlapEn=True
                   ))
 
         self.add(pr.RemoteVariable
@@ -219,14 +150,15 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=8,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'
+                  mode='RO',
+                  overlapEn=True
                   ))
 
         self.add(pr.LinkVariable(
             name='NctLocTemp',
             mode='RO',
             units='deg C',
-            linkedGet=getNctTempLoc,
+            linkedGet=self._linkedGet,
             disp='{:1.2f}',
             dependencies=[self.NctLocTempRaw],
         ))
@@ -238,7 +170,8 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=8,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'))
+                  mode='RO',
+                  overlapEn=True))
 
         self.add(pr.RemoteVariable
                  (name='NctRemTempHRaw',
@@ -247,13 +180,14 @@ class EpixQuadMonitor(pr.Device):
                   bitSize=8,
                   bitOffset=0,
                   base=pr.UInt,
-                  mode='RO'))
+                  mode='RO',
+                  overlapEn=True))
 
         self.add(pr.LinkVariable(
             name='NctRemTemp',
             mode='RO',
             units='deg C',
-            linkedGet=getNctTemp,
+            linkedGet=self._linkedGet,
             disp='{:1.2f}',
             dependencies=[self.NctRemTempHRaw, self.NctRemTempLRaw],
         ))
@@ -267,6 +201,7 @@ class EpixQuadMonitor(pr.Device):
                 bitOffset=0,
                 base=pr.UInt,
                 mode='RO',
+                overlapEn=True,
             ))
 
         for i in range(4):
@@ -274,7 +209,7 @@ class EpixQuadMonitor(pr.Device):
                 name=('ASIC_A%d_2V5_Current' % i),
                 mode='RO',
                 units='A',
-                linkedGet=getLt3086DoubleCurr,
+                linkedGet=self._linkedGet,
                 disp='{:1.3f}',
                 dependencies=[self.AD7949DataRaw[i]],
             ))
@@ -284,7 +219,7 @@ class EpixQuadMonitor(pr.Device):
                 name=('ASIC_D%d_2V5_Current' % i),
                 mode='RO',
                 units='mA',
-                linkedGet=getLt3086SingleCurr,
+                linkedGet=self._linkedGet,
                 disp='{:1.3f}',
                 dependencies=[self.AD7949DataRaw[4 + i]],
             ))
@@ -294,7 +229,7 @@ class EpixQuadMonitor(pr.Device):
                 name=('Therm%d_Temp' % i),
                 mode='RO',
                 units='deg C',
-                linkedGet=getThermistorTemp,
+                linkedGet=self._linkedGet,
                 disp='{:1.3f}',
                 dependencies=[self.AD7949DataRaw[6 + i]],
             ))
@@ -309,13 +244,14 @@ class EpixQuadMonitor(pr.Device):
                 base=pr.UInt,
                 mode='RO',
                 verify=False,
+                overlapEn=True,
             ))
 
         self.add(pr.LinkVariable(
             name='PwrDigCurr',
             mode='RO',
             units='A',
-            linkedGet=getPwrCurr,
+            linkedGet=self._linkedGet,
             disp='{:1.3f}',
             dependencies=[self.SensorRegRaw[0]],
         ))
@@ -324,7 +260,7 @@ class EpixQuadMonitor(pr.Device):
             name='PwrDigVin',
             mode='RO',
             units='V',
-            linkedGet=getPwrVin,
+            linkedGet=self._linkedGet,
             disp='{:1.3f}',
             dependencies=[self.SensorRegRaw[1]],
         ))
@@ -333,7 +269,7 @@ class EpixQuadMonitor(pr.Device):
             name='PwrDigTemp',
             mode='RO',
             units='deg C',
-            linkedGet=getPwrTemp,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[2]],
         ))
@@ -342,7 +278,7 @@ class EpixQuadMonitor(pr.Device):
             name='PwrAnaCurr',
             mode='RO',
             units='A',
-            linkedGet=getPwrCurr,
+            linkedGet=self._linkedGet,
             disp='{:1.3f}',
             dependencies=[self.SensorRegRaw[3]],
         ))
@@ -351,7 +287,7 @@ class EpixQuadMonitor(pr.Device):
             name='PwrAnaVin',
             mode='RO',
             units='V',
-            linkedGet=getPwrVin,
+            linkedGet=self._linkedGet,
             disp='{:1.3f}',
             dependencies=[self.SensorRegRaw[4]],
         ))
@@ -360,7 +296,7 @@ class EpixQuadMonitor(pr.Device):
             name='PwrAnaTemp',
             mode='RO',
             units='deg C',
-            linkedGet=getPwrTemp,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[5]],
         ))
@@ -376,6 +312,7 @@ class EpixQuadMonitor(pr.Device):
                 base=pr.UInt,
                 mode='RO',
                 verify=False,
+                overlapEn=True,
             ))
 
         LdoNames = [
@@ -388,12 +325,14 @@ class EpixQuadMonitor(pr.Device):
             'A2_1_8V_Temp'
         ]
 
+        self._ldoNames = LdoNames
+
         for i in range(13):
             self.add(pr.LinkVariable(
                 name=LdoNames[i],
                 mode='RO',
                 units='deg C',
-                linkedGet=getLdoTemp,
+                linkedGet=self._linkedGet,
                 disp='{:3.1f}',
                 dependencies=[self.SensorRegRaw[i + 6]],
             ))
@@ -402,7 +341,7 @@ class EpixQuadMonitor(pr.Device):
             name='PcbAnaTemp0',
             mode='RO',
             units='deg C',
-            linkedGet=getAnaTemp,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[19]],
         ))
@@ -411,7 +350,7 @@ class EpixQuadMonitor(pr.Device):
             name='PcbAnaTemp1',
             mode='RO',
             units='deg C',
-            linkedGet=getAnaTemp,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[20]],
         ))
@@ -420,7 +359,7 @@ class EpixQuadMonitor(pr.Device):
             name='PcbAnaTemp2',
             mode='RO',
             units='deg C',
-            linkedGet=getAnaTemp,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[21]],
         ))
@@ -436,13 +375,14 @@ class EpixQuadMonitor(pr.Device):
                 base=pr.UInt,
                 mode='RO',
                 verify=False,
+                overlapEn=True,
             ))
 
         self.add(pr.LinkVariable(
             name='TrOptTemp',
             mode='RO',
             units='deg C',
-            linkedGet=getTrOptTemp,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[22]],
         ))
@@ -451,7 +391,7 @@ class EpixQuadMonitor(pr.Device):
             name='TrOptVcc',
             mode='RO',
             units='V',
-            linkedGet=getTrOptVolt,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[23]],
         ))
@@ -460,7 +400,7 @@ class EpixQuadMonitor(pr.Device):
             name='TrOptTxPwr',
             mode='RO',
             units='uW',
-            linkedGet=getTrOptPwr,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[24]],
         ))
@@ -469,11 +409,29 @@ class EpixQuadMonitor(pr.Device):
             name='TrOptRxPwr',
             mode='RO',
             units='uW',
-            linkedGet=getTrOptPwr,
+            linkedGet=self._linkedGet,
             disp='{:3.1f}',
             dependencies=[self.SensorRegRaw[25]],
         ))
 
+        # Each window overlaps its raw registers, which puts them in one block
+        # read in a single transaction. Polling only the windows refreshes every
+        # raw register and link variable with three reads per poll.
+        for name, offset, words in self.windows:
+            self.add(pr.RemoteVariable(
+                name=name,
+                description=('Raw registers 0x%x to 0x%x' % (offset, offset + 4 * words - 1)),
+                offset=offset,
+                bitSize=32 * words,
+                bitOffset=0,
+                base=pr.UInt,
+                mode='RO',
+                verify=False,
+                hidden=True,
+                overlapEn=True,
+                pollInterval=pollInterval,
+            ))
+
         #####################################
         # Create commands
         #####################################
@@ -484,6 +442,80 @@ class EpixQuadMonitor(pr.Device):
         # A command can also be a call to a local function with local scope.
         # The command object and the arg are passed
 
+    def _windowWords(self, name, words):
+        value = self.nodes[name].value()
+        return np.frombuffer(int(value or 0).to_bytes(4 * words, 'little'), dtype='<u4')
+
+    def derivedValues(self):
+        """converted values of every link variable, computed once per read of the windows"""
+        raw = tuple(self.nodes[name].value() for name, offset, words in self.windows)
+        with self._derivedLock:
+            if raw != self._derivedRaw:
+                self._derived = self._convert(*[self._windowWords(name, words) for name, offset, words in self.windows])
+                self._derivedRaw = raw
+            return self._derived
+
+    def readValues(self):
+        """reads the register windows and returns the converted values"""
+        for name, offset, words in self.windows:
+            self.nodes[name].get()
+        return self.derivedValues()
+
+    def _linkedGet(self, var):
+        return self.derivedValues()[var.name]
+
+    def _convert(self, status, ad, sensor):
+        values = {}
+
+        values['ShtHum'] = (status[1] & 0xFFFF) / 65535.0 * 100.0
+        values['ShtTemp'] = (status[2] & 0xFFFF) / 65535.0 * 175.0 - 45.0
+        values['NctLocTemp'] = (status[4] & 0xFF) * 1.0
+        values['NctRemTemp'] = (status[6] & 0xFF) * 1.0 + ((status[5] & 0xFF) >> 6) * 0.25
+
+        ad = (ad & 0x3FFF).astype(float)
+
+        # LT3086 Imon = Iin / 1000, Rload = 330 ohm, ADC buffer gain x 2
+        # two parallel LDOs for the analog supplies in A, one LDO for the digital ones in mA
+        for i in range(4):
+            values['ASIC_A%d_2V5_Current' % i] = ad[i] / 16383.0 * 2.5 / 330.0 * 1000
+        for i in range(2):
+            values['ASIC_D%d_2V5_Current' % i] = ad[4 + i] / 16383.0 * 2.5 / 330.0 * 1000000 / 2.0
+
+        # resistor divider 100k and MC65F103B (Rt25=10k), Vref 2.5V
+        x = ad[6:8]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Umeas = x / 16383.0 * 2.5
+            Rtherm = (2.5 - Umeas) / (Umeas / 100000)
+            LnRtR25 = np.log(Rtherm / 10000.0)
+            TthermK = 1.0 / (3.3538646E-03 + 2.5654090E-04 * LnRtR25 +
+                             1.9243889E-06 * (LnRtR25**2) + 1.0969244E-07 * (LnRtR25**3))
+        TthermK = np.where(Rtherm > 0.0, TthermK, 0.0) - 273.15
+        for i in range(2):
+            values['Therm%d_Temp' % i] = TthermK[i] if x[i] != 0 else 0.0
+
+        sensor = sensor.astype(float)
+        a = 130.0 / (0.882 - 1.951)
+        b = (0.882 / 0.0082) + 100
+        for i, name in ((0, 'PwrDig'), (3, 'PwrAna')):
+            values[name + 'Curr'] = sensor[i] * 0.1024 / 4095 / 0.02
+            values[name + 'Vin'] = sensor[i + 1] * 102.4 / 4095
+            values[name + 'Temp'] = sensor[i + 2] * 2.048 / 4095 * a + b
+
+        ldo = sensor[6:19] * 1.65 / 65535 * 100
+        for i, name in enumerate(self._ldoNames):
+            values[name] = ldo[i]
+
+        pcb = sensor[19:22] * 1.65 / 65535 * a + b
+        for i in range(3):
+            values['PcbAnaTemp%d' % i] = pcb[i]
+
+        values['TrOptTemp'] = sensor[22] * 1.0 / 256
+        values['TrOptVcc'] = sensor[23] * 0.0001
+        values['TrOptTxPwr'] = sensor[24] * 0.1
+        values['TrOptRxPwr'] = sensor[25] * 0.1
+
+        return {k: float(v) for k, v in values.items()}
+
     @staticmethod
     def frequencyConverter(self):
         def func(dev, var):
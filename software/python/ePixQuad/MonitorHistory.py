@@ -0,0 +1,302 @@
+#-----------------------------------------------------------------------------
+# Title      : Slow control monitoring history files
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+#
+# A history directory holds one sub directory per tier (raw samples and the
+# aggregated tiers) and a fields.json with the record layout. Each tier is a
+# sequence of chunk files of chunkRecords records, named after the time of
+# their first record. A chunk stores its columns one after the other: the
+# float64 time column, initialised to NaN, then one column per field. The
+# time of a record is written last, so a record cut by a crash is not seen.
+# A query bisects the chunk start times and then the time column of the
+# chunks it touches, the rest of the history is not read.
+#
+#-----------------------------------------------------------------------------
+
+import bisect
+import json
+import os
+import time
+
+import numpy as np
+
+
+class ColumnStore():
+    """append only chunked columnar store of (time, fields) records with non decreasing times"""
+
+    def __init__(self, directory, fields, dtype=np.float32, chunkRecords=4096):
+        self.directory = directory
+        self.fields = list(fields)
+        self.dtype = np.dtype(dtype)
+        self.chunkRecords = chunkRecords
+
+        os.makedirs(directory, exist_ok=True)
+        names = sorted(f for f in os.listdir(directory) if f.endswith('.col'))
+        self._starts = [int(f[:-4]) * 1e-6 for f in names]
+        self._names = names
+
+        self._chunk = None
+        self._count = 0
+        self._lastTime = -np.inf
+        if names:
+            self._openChunk(names[-1])
+            times = self._chunk[0]
+            self._count = int(np.count_nonzero(~np.isnan(times)))
+            if self._count:
+                self._lastTime = float(times[self._count - 1])
+
+    def _columns(self, mm):
+        # time column then one column per field
+        n = self.chunkRecords
+        times = mm[:8 * n].view(np.float64)
+        cols = [mm[8 * n + i * self.dtype.itemsize * n:8 * n + (i + 1) * self.dtype.itemsize * n].view(self.dtype)
+                for i in range(len(self.fields))]
+        return [times] + cols
+
+    def _chunkBytes(self):
+        return (8 + self.dtype.itemsize * len(self.fields)) * self.chunkRecords
+
+    def _map(self, name, mode):
+        return np.memmap(os.path.join(self.directory, name), dtype=np.uint8, mode=mode, shape=(self._chunkBytes(),))
+
+    def _openChunk(self, name):
+        self._mm = self._map(name, 'r+')
+        self._chunk = self._columns(self._mm)
+
+    def _newChunk(self, t):
+        self.flush()
+        name = '%020d.col' % int(t * 1e6)
+        self._mm = self._map(name, 'w+')
+        self._chunk = self._columns(self._mm)
+        self._chunk[0][:] = np.nan
+        self._count = 0
+        self._starts.append(int(t * 1e6) * 1e-6)
+        self._names.append(name)
+
+    def __len__(self):
+        return max(len(self._names) - 1, 0) * self.chunkRecords + self._count
+
+    @property
+    def lastTime(self):
+        return self._lastTime
+
+    def append(self, t, values):
+        """appends one record, values in the order of fields"""
+        if t < self._lastTime:
+            raise ValueError(f'Record time {t} before the last record {self._lastTime}')
+        if self._chunk is None or self._count == self.chunkRecords:
+            self._newChunk(t)
+        n = self._count
+        for col, value in zip(self._chunk[1:], values):
+            col[n] = value
+        self._chunk[0][n] = t
+        self._count += 1
+        self._lastTime = t
+
+    def last(self):
+        """(time, values) of the last record, None when empty"""
+        if self._chunk is None or self._count == 0:
+            return None
+        n = self._count - 1
+        return float(self._chunk[0][n]), np.array([col[n] for col in self._chunk[1:]], dtype=np.float64)
+
+    def replaceLast(self, values):
+        """overwrites the values of the last record"""
+        n = self._count - 1
+        for col, value in zip(self._chunk[1:], values):
+            col[n] = value
+
+    def flush(self):
+        """writes the current chunk to disk (msync)"""
+        if self._chunk is not None:
+            self._mm.flush()
+
+    def close(self):
+        self.flush()
+        self._chunk = None
+        self._mm = None
+
+    def query(self, t0, t1, fields=None):
+        """records with t0 <= time <= t1 as a dict of arrays, 'time' and the fields"""
+        fields = self.fields if fields is None else list(fields)
+        index = [self.fields.index(f) + 1 for f in fields]
+
+        # the chunk holding t0 to the last chunk starting before t1
+        first = max(bisect.bisect_right(self._starts, t0) - 1, 0)
+        last = bisect.bisect_right(self._starts, t1)
+
+        parts = [[] for i in range(len(fields) + 1)]
+        for name in self._names[first:last]:
+            if self._chunk is not None and name == self._names[-1]:
+                cols = self._chunk
+            else:
+                cols = self._columns(self._map(name, 'r'))
+            # NaN sorts last, the unwritten tail of a chunk is never selected
+            i0 = np.searchsorted(cols[0], t0, 'left')
+            i1 = np.searchsorted(cols[0], t1, 'right')
+            if i1 > i0:
+                parts[0].append(np.array(cols[0][i0:i1]))
+                for k, i in enumerate(index):
+                    parts[k + 1].append(np.array(cols[i][i0:i1]))
+
+        out = {'time': np.concatenate(parts[0]) if parts[0] else np.zeros(0, dtype=np.float64)}
+        for k, f in enumerate(fields):
+            out[f] = np.concatenate(parts[k + 1]) if parts[k + 1] else np.zeros(0, dtype=self.dtype)
+        return out
+
+
+class _Aggregator():
+    """mean, min and max of every field over bins of period seconds"""
+
+    def __init__(self, period, width):
+        self.period = period
+        self._bin = None
+        self._sum = np.zeros(width)
+        self._cnt = np.zeros(width)
+        self._min = np.full(width, np.inf)
+        self._max = np.full(width, -np.inf)
+
+    def add(self, t, values):
+        """adds a sample, returns (binTime, record) when the sample starts a new bin"""
+        b = np.floor(t / self.period)
+        out = None
+        if self._bin is not None and b != self._bin:
+            out = self.result()
+        if self._bin != b:
+            self._bin = b
+            self._sum[:] = 0.0
+            self._cnt[:] = 0
+            self._min[:] = np.inf
+            self._max[:] = -np.inf
+        valid = ~np.isnan(values)
+        self._sum[valid] += values[valid]
+        self._cnt[valid] += 1
+        np.fmin(self._min, values, out=self._min)
+        np.fmax(self._max, values, out=self._max)
+        return out
+
+    def resume(self, t, record):
+        """continues the bin of a stored record, its count stands for the count of every field"""
+        width = len(self._sum)
+        mean, low, high, count = record[:width], record[width:2 * width], record[2 * width:3 * width], record[-1]
+        valid = ~np.isnan(mean)
+        self._bin = np.floor(t / self.period)
+        self._cnt[:] = np.where(valid, count, 0)
+        self._sum[:] = np.where(valid, mean * count, 0.0)
+        self._min[:] = np.where(valid, low, np.inf)
+        self._max[:] = np.where(valid, high, -np.inf)
+
+    def result(self):
+        if self._bin is None:
+            return None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._sum / self._cnt
+        empty = self._cnt == 0
+        return (self._bin * self.period,
+                np.concatenate([mean, np.where(empty, np.nan, self._min), np.where(empty, np.nan, self._max),
+                                [self._cnt.max()]]))
+
+
+class MonitorHistory():
+    """raw and aggregated history of a fixed set of monitoring fields"""
+
+    # (tier name, aggregation period in seconds)
+    defaultTiers = (('1min', 60.0), ('1hour', 3600.0))
+
+    def __init__(self, directory, fields=None, tiers=defaultTiers, dtype='float32', chunkRecords=4096, fsyncInterval=10.0):
+        """fields=None opens an existing history, otherwise they must match the ones on disk"""
+        self.directory = directory
+        self.fsyncInterval = fsyncInterval
+
+        layout = {'fields': None if fields is None else list(fields),
+                  'tiers': [[name, float(period)] for name, period in tiers],
+                  'dtype': np.dtype(dtype).str,
+                  'chunkRecords': chunkRecords}
+
+        meta = os.path.join(directory, 'fields.json')
+        if os.path.exists(meta):
+            with open(meta) as f:
+                stored = json.load(f)
+            if fields is not None and stored != layout:
+                raise ValueError(f'{directory} holds a different history layout: {stored}')
+            layout = stored
+        elif fields is None:
+            raise ValueError(f'{directory} holds no history and no fields were given')
+        else:
+            os.makedirs(directory, exist_ok=True)
+            with open(meta, 'w') as f:
+                json.dump(layout, f, indent=1)
+
+        self.fields = layout['fields']
+        self.tiers = [(name, period) for name, period in layout['tiers']]
+        dtype = np.dtype(layout['dtype'])
+        chunkRecords = layout['chunkRecords']
+
+        self._stores = {'raw': ColumnStore(os.path.join(directory, 'raw'), self.fields, dtype, chunkRecords)}
+        aggFields = ([f + '_mean' for f in self.fields] + [f + '_min' for f in self.fields] +
+                     [f + '_max' for f in self.fields] + ['count'])
+        self._aggregators = []
+        for name, period in self.tiers:
+            self._stores[name] = ColumnStore(os.path.join(directory, name), aggFields, dtype, chunkRecords)
+            agg = _Aggregator(period, len(self.fields))
+            # a bin stored by close() is continued instead of starting a second record of it
+            last = self._stores[name].last()
+            if last is not None:
+                agg.resume(*last)
+            self._aggregators.append((name, agg))
+
+        self._lastSync = time.monotonic()
+
+    def append(self, t, values):
+        """stores a sample, values is a dict (missing fields are NaN) or a sequence in field order"""
+        if isinstance(values, dict):
+            values = [values.get(f, np.nan) for f in self.fields]
+        values = np.asarray(values, dtype=np.float64)
+
+        self._stores['raw'].append(t, values)
+        for name, agg in self._aggregators:
+            out = agg.add(t, values)
+            if out is not None:
+                self._storeBin(name, *out)
+
+        now = time.monotonic()
+        if now - self._lastSync >= self.fsyncInterval:
+            self.flush()
+            self._lastSync = now
+
+    def _storeBin(self, name, t, record):
+        store = self._stores[name]
+        if store.lastTime == t:
+            store.replaceLast(record)
+        else:
+            store.append(t, record)
+
+    def flush(self):
+        for store in self._stores.values():
+            store.flush()
+
+    def close(self):
+        """stores the partly filled aggregation bins and closes the files"""
+        for name, agg in self._aggregators:
+            out = agg.result()
+            if out is not None:
+                self._storeBin(name, *out)
+        for store in self._stores.values():
+            store.close()
+
+    def __len__(self):
+        return len(self._stores['raw'])
+
+    def query(self, t0, t1, tier='raw', fields=None):
+        """time window of a tier as numpy arrays, the aggregated tiers have <field>_mean/_min/_max and count"""
+        if tier not in self._stores:
+            raise ValueError(f'Invalid tier {tier}, expected one of {list(self._stores)}')
+        return self._stores[tier].query(t0, t1, fields)
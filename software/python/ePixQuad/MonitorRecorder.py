@@ -0,0 +1,181 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue base module - Monitoring History Recorder Device
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+import threading
+import time
+
+from ePixQuad.MonitorHistory import MonitorHistory
+
+class MonitorRecorder(pr.Device):
+    """Samples the monitoring sources every Period and appends them to a MonitorHistory directory"""
+
+    def __init__(self,directory='monitorHistory',period=1.0,fsyncInterval=10.0,tiers=MonitorHistory.defaultTiers,**kwargs):
+
+        pr.Device.__init__(self, **kwargs)
+
+        self._tiers = tiers
+        self._sources = []
+        self._history = None
+        self._worker = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._recordCount = 0
+        self._errorCount = 0
+        self._lastTime = 0.0
+
+        self.add(pr.LocalVariable(
+            name         = 'Directory',
+            description  = 'History directory, read when the recording starts',
+            value        = directory,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'Period',
+            description  = 'Time between samples',
+            value        = period,
+            units        = 's',
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'FsyncInterval',
+            description  = 'Time between flushes of the history files, read when the recording starts',
+            value        = fsyncInterval,
+            units        = 's',
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'RecordEn',
+            description  = 'Record the monitoring sources',
+            value        = False,
+            localSet     = self._recordEnSet,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'RecordCount',
+            description  = 'Samples recorded since the last count reset',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._recordCount,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'ErrorCount',
+            description  = 'Failed source reads and rejected samples since the last count reset',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._errorCount,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'LastRecordTime',
+            description  = 'Time of the last recorded sample',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 's',
+            pollInterval = 1,
+            localGet     = lambda: self._lastTime,
+        ))
+
+    def addSource(self, func):
+        """func() returns a dict of field values, the fields of the first sample fix the history layout"""
+        self._sources.append(func)
+
+    def addVariables(self, variables):
+        """records the values of variables, named after the variables"""
+        variables = list(variables)
+        self.addSource(lambda: {var.name: var.get() for var in variables})
+
+    @property
+    def history(self):
+        """the open MonitorHistory while recording, None otherwise"""
+        return self._history
+
+    def query(self, t0, t1, tier='raw', fields=None):
+        """time window of the recorded history, see MonitorHistory.query()"""
+        with self._lock:
+            if self._history is not None:
+                return self._history.query(t0, t1, tier, fields)
+        history = MonitorHistory(self.Directory.value())
+        try:
+            return history.query(t0, t1, tier, fields)
+        finally:
+            history.close()
+
+    def countReset(self):
+        self._recordCount = 0
+        self._errorCount = 0
+        super().countReset()
+
+    def _sample(self):
+        values = {}
+        ok = True
+        for func in self._sources:
+            try:
+                values.update(func())
+            except Exception:
+                ok = False
+                self._errorCount += 1
+                self._log.exception('Monitoring source read failed')
+        return values, ok
+
+    def _record(self):
+        t = time.time()
+        values, ok = self._sample()
+        with self._lock:
+            if self._history is None:
+                # the layout is taken from a complete sample, later failed sources are stored as NaN
+                if not (ok and values):
+                    return
+                self._history = MonitorHistory(self.Directory.value(), fields=list(values), tiers=self._tiers,
+                                               fsyncInterval=self.FsyncInterval.value())
+            try:
+                self._history.append(t, values)
+            except ValueError:
+                # the system clock stepped back
+                self._errorCount += 1
+                return
+        self._recordCount += 1
+        self._lastTime = t
+
+    def _run(self):
+        while not self._wake.wait(timeout=max(self.Period.value(), 0.01)):
+            try:
+                self._record()
+            except Exception:
+                self._errorCount += 1
+                self._log.exception('Monitoring history record failed')
+
+    def _recordEnSet(self, value):
+        if value:
+            if self._worker is None:
+                self._wake.clear()
+                self._worker = threading.Thread(target=self._run, name=f'{self.path}.worker', daemon=True)
+                self._worker.start()
+        else:
+            self._stopRecording()
+
+    def _stopRecording(self):
+        if self._worker is not None:
+            self._wake.set()
+            self._worker.join()
+            self._worker = None
+        with self._lock:
+            if self._history is not None:
+                self._history.close()
+                self._history = None
+
+    def _stop(self):
+        self._stopRecording()
+        super()._stop()
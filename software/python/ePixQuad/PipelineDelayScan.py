@@ -0,0 +1,178 @@
+#-----------------------------------------------------------------------------
+# Title      : ePixQuad ADC pipeline delay scan
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# Scans RdoutCore.AdcPipelineDelay with a pulsed pixel region in every bank
+# and finds the delay maximizing the pulsed signal of all 64 banks at once.
+# The statistics are computed on the scrambled frames, the pixel masks are
+# scrambled once instead of descrambling every frame.
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.stream as ris
+import numpy as np
+import threading
+import time
+
+import ePixViewer.Cameras as cameras
+
+class BankStatistics(ris.Slave):
+    """Per bank pulsed signal of a fixed number of ePixQuad frames"""
+
+    headerSize = 32
+    adcMask = 0x3FFF
+
+    def __init__(self, height=712, width=768, asicRows=178, bankCols=48, rows=range(20, 24), cols=range(5, 8),
+                 lineReverse=0b1010, signal=None):
+        ris.Slave.__init__(self)
+
+        self.height = height
+        self.width = width
+        self.numBanks = (height // asicRows) * (width // bankCols)
+        self.frameSize = self.headerSize + height * width * 2
+
+        # bank number of every descrambled pixel
+        bank = np.arange(self.numBanks).reshape(height // asicRows, 1, width // bankCols, 1)
+        bank = np.broadcast_to(bank, (height // asicRows, asicRows, width // bankCols, bankCols)).reshape(height, width)
+
+        # scramble the bank map to the super-row order of the frames
+        order = cameras.ePixQuadRowOrder(height)
+        rawBank = np.empty_like(bank)
+        rawBank[order] = bank
+
+        # pulsed pixels, by default the SetAsicMatrixTest region of every bank. Raw super-rows
+        # 4r..4r+3 hold ASIC row r of the four ASIC lines, the lines set in lineReverse
+        # (RdoutCore LINE_REVERSE_G) are read out with mirrored bank columns.
+        if signal is None:
+            lines = height // asicRows
+            rawSignal = np.zeros((asicRows, lines, width // bankCols, bankCols), dtype=bool)
+            for line in range(lines):
+                bankCol = np.array(cols)
+                if (lineReverse >> line) & 1:
+                    bankCol = bankCols - 1 - bankCol
+                rawSignal[rows[0]:rows[-1] + 1, line, :, bankCol] = True
+            rawSignal = rawSignal.reshape(height, width)
+        else:
+            # descrambled image coordinates
+            rawSignal = np.empty_like(signal)
+            rawSignal[order] = signal
+
+        self._sigIdx = np.flatnonzero(rawSignal)
+        self._sigBank = rawBank.ravel()[self._sigIdx]
+        self._sigCount = np.bincount(self._sigBank, minlength=self.numBanks)
+        self._bgIdx = np.flatnonzero(~rawSignal)
+        self._bgBank = rawBank.ravel()[self._bgIdx]
+        self._bgCount = np.bincount(self._bgBank, minlength=self.numBanks)
+
+        self._buf = bytearray(self.frameSize)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+        self._values = np.zeros((0, self.numBanks))
+        self._count = 0
+        self.rejected = 0
+
+    def arm(self, numFrames):
+        """accepts the next numFrames frames"""
+        with self._lock:
+            self._values = np.zeros((numFrames, self.numBanks))
+            self._count = 0
+            self._done.clear()
+
+    def wait(self, timeout=None):
+        """True once the armed number of frames has been received"""
+        return self._done.wait(timeout)
+
+    def result(self):
+        """per bank signal mean and rms over the frames, (numBanks,) each"""
+        with self._lock:
+            values = self._values[:self._count]
+        if len(values) == 0:
+            return np.full(self.numBanks, np.nan), np.full(self.numBanks, np.nan)
+        return values.mean(axis=0), values.std(axis=0)
+
+    def _acceptFrame(self, frame):
+        if self._done.is_set():
+            return
+
+        with frame.lock():
+            if frame.getError() != 0 or frame.getPayload() < self.frameSize:
+                self.rejected += 1
+                return
+            frame.read(self._buf, 0)
+
+        # VC0 data frames only
+        if self._buf[0] & 0xF != 0:
+            return
+
+        data = np.frombuffer(self._buf, dtype=np.uint16, count=self.height * self.width, offset=self.headerSize)
+        sig = np.bincount(self._sigBank, weights=data[self._sigIdx] & self.adcMask, minlength=self.numBanks)
+        bg = np.bincount(self._bgBank, weights=data[self._bgIdx] & self.adcMask, minlength=self.numBanks)
+
+        with self._lock:
+            if self._count < len(self._values):
+                self._values[self._count] = sig / self._sigCount - bg / self._bgCount
+                self._count += 1
+                if self._count == len(self._values):
+                    self._done.set()
+
+
+class PipelineDelayScan(object):
+    """Coarse to fine AdcPipelineDelay scan of all banks"""
+
+    def __init__(self, root, stats, numFrames=50, delays=range(256), coarseStep=8, timeout=10.0):
+        self._root = root
+        self.stats = stats
+        self.numFrames = numFrames
+        self.delays = list(delays)
+        self.coarseStep = coarseStep
+        self.timeout = timeout
+
+        # delay -> (mean, rms) per bank
+        self.results = {}
+
+    def setDelay(self, delay):
+        self._root.RdoutCore.AdcPipelineDelay.set(0xAAAA0000 | delay)
+
+    def measure(self, delay):
+        """per bank signal mean and rms at one delay"""
+        self.setDelay(delay)
+        self.stats.arm(self.numFrames)
+        self._root.SystemRegs.AutoTrigEn.set(True)   # start auto trigger counter
+        received = self.stats.wait(self.timeout)
+        self._root.SystemRegs.AutoTrigEn.set(False)  # stop and reset auto trigger counter
+        if not received:
+            raise TimeoutError(f'AdcPipelineDelay {delay}: frames missing after {self.timeout} s')
+        self.results[delay] = self.stats.result()
+        return self.results[delay]
+
+    def best(self):
+        """delay of the maximum signal of every bank, (numBanks,)"""
+        delays = np.array(sorted(self.results))
+        mean = np.array([self.results[d][0] for d in delays])
+        return delays[np.nanargmax(mean, axis=0)]
+
+    def run(self, callback=None):
+        """scans the coarse grid, then every delay around the best coarse delay of any bank"""
+        coarse = self.delays[::max(self.coarseStep, 1)]
+        for delay in coarse:
+            self.measure(delay)
+            if callback is not None:
+                callback(delay, *self.results[delay])
+
+        if self.coarseStep > 1:
+            fine = set()
+            for delay in np.unique(self.best()):
+                fine.update(d for d in self.delays if abs(d - delay) < self.coarseStep)
+            for delay in sorted(fine - set(self.results)):
+                self.measure(delay)
+                if callback is not None:
+                    callback(delay, *self.results[delay])
+
+        return self.best()
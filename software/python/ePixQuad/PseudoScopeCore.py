@@ -18,13 +18,100 @@
 # contained in the LICENSE.txt file.
 # -----------------------------------------------------------------------------
 import pyrogue as pr
+import rogue.interfaces.stream as ris
 import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+
+
+class ScopeTraces():
+    """Captured traces, (N, 2, L) ADC counts of channels A and B with their arrival times"""
+
+    # 14 bit samples over the +-1 V range, as in the viewer
+    adcBits = 14
+
+    def __init__(self, traces, times, sampleRate=1.0):
+        self.traces = traces
+        self.times = times
+        self.sampleRate = sampleRate
+        self._average = None
+        self._rms = None
+        self._psd = None
+
+    def __len__(self):
+        return len(self.traces)
+
+    def volts(self, counts):
+        return -1.0 + counts * (2.0 / 2**self.adcBits)
+
+    def average(self):
+        """average trace of each channel in V, (2, L)"""
+        if self._average is None:
+            self._average = self.volts(self.traces.mean(axis=0, dtype=np.float64))
+        return self._average
+
+    def rms(self):
+        """RMS around the average trace at each sample in V, (2, L)"""
+        if self._rms is None:
+            self._rms = self.traces.std(axis=0, dtype=np.float64) * (2.0 / 2**self.adcBits)
+        return self._rms
+
+    def noise(self):
+        """RMS of each channel around its average trace over all samples in V, (2,)"""
+        return np.sqrt(np.mean(self.rms()**2, axis=1))
+
+    def psd(self, block=64):
+        """(frequencies, power spectral density in V^2/Hz) of each channel, Hann window averaged over the traces"""
+        if self._psd is None:
+            n = self.traces.shape[2]
+            window = np.hanning(n)
+            power = np.zeros((2, n // 2 + 1))
+            # blocks of traces bound the size of the float and complex copies
+            for first in range(0, len(self.traces), block):
+                x = self.traces[first:first + block].astype(np.float64)
+                x -= x.mean(axis=2, keepdims=True)
+                power += np.sum(np.abs(np.fft.rfft(x * window, axis=2))**2, axis=0)
+            # one sided density, DC and Nyquist are not doubled
+            power *= (2.0 / 2**self.adcBits)**2 * 2.0 / (max(len(self.traces), 1) * self.sampleRate * np.sum(window**2))
+            power[:, 0] /= 2.0
+            if n % 2 == 0:
+                power[:, -1] /= 2.0
+            self._psd = (np.fft.rfftfreq(n, 1.0 / self.sampleRate), power)
+        return self._psd
+
+    def analyze(self):
+        """computes the average, RMS and PSD, returns self"""
+        if len(self.traces):
+            self.average()
+            self.rms()
+            self.psd()
+        return self
+
+
+class PseudoScopeCore(pr.Device,ris.Slave):
+
+    # frame header and footer around the A then B traces, 16 bit samples
+    headerBytes = 32
+    footerBytes = 20
 
-class PseudoScopeCore(pr.Device):
     def __init__(self, **kwargs):
         """Create PseudoScopeCore"""
-        super().__init__(description='Pseudo Scope Regsisters', **kwargs)
+        pr.Device.__init__(self, description='Pseudo Scope Regsisters', **kwargs)
+        ris.Slave.__init__(self)
+
+        # Capture state, see capture()
+        self._cond = threading.Condition()
+        self._capN = 0
+        self._capCount = 0
+        self._capTraces = None
+        self._capTimes = None
+        self._capCancel = False
+        self._executor = None
+        self._traceCount = 0
+        self._badCount = 0
 
         # Creation. memBase is either the register bus server (srp, rce mapped memory, etc) or the device which
         # contains this object. In most cases the parent and memBase are the same but they can be
@@ -167,6 +254,33 @@ class PseudoScopeCore(pr.Device):
             mode='RW',
         ))
 
+        self.add(pr.LocalVariable(
+            name         = 'TraceCount',
+            description  = 'Scope frames received since the last count reset',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._traceCount,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'BadTraceCount',
+            description  = 'Errored scope frames or frames of another trace length during a capture',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._badCount,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'CaptureProgress',
+            description  = 'Traces collected by the running capture',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._capCount,
+        ))
+
         #####################################
         # Create commands
         #####################################
@@ -177,6 +291,106 @@ class PseudoScopeCore(pr.Device):
         # A command can also be a call to a local function with local scope.
         # The command object and the arg are passed
 
+    def countReset(self):
+        self._traceCount = 0
+        self._badCount = 0
+        super().countReset()
+
+    def capture(self, n, timeout=10.0, softTrigger=False, sampleRate=1.0, traceLength=None):
+        """Collects n traces from the scope stream into a ScopeTraces. With TrigMode 1 the
+           scope is re-armed after each trace, softTrigger also writes Trig. traceLength
+           (samples per channel) preallocates the buffer, by default it is sized from the
+           first trace. sampleRate sets the PSD frequency unit, 1.0 gives cycles per sample."""
+        with self._cond:
+            if self._capN:
+                raise RuntimeError('A scope capture is already running')
+            self._capTraces = None if traceLength is None else np.empty((n, 2, traceLength), dtype=np.uint16)
+            self._capTimes = np.zeros(n, dtype=np.float64)
+            self._capCount = 0
+            self._capCancel = False
+            self._capN = n
+
+        try:
+            rearm = self.TrigMode.get() == 1
+            deadline = time.monotonic() + timeout
+            armed = -1
+            while True:
+                with self._cond:
+                    count = self._capCount
+                    if count >= n or self._capCancel:
+                        break
+                    if count == armed:
+                        # waiting for the trace of the last arm
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                        continue
+                if rearm:
+                    self.Arm.set(True)
+                if softTrigger:
+                    self.Trig.set(True)
+                armed = count
+        finally:
+            with self._cond:
+                traces, times, count, cancelled = self._capTraces, self._capTimes, self._capCount, self._capCancel
+                self._capN = 0
+                self._capTraces = None
+
+        if count < n and not cancelled:
+            raise TimeoutError(f'{count} of {n} scope traces received in {timeout} s')
+        if traces is None:
+            traces = np.zeros((0, 2, traceLength or 0), dtype=np.uint16)
+        return ScopeTraces(traces[:count], times[:count], sampleRate)
+
+    def startCapture(self, n, analyze=True, **kwargs):
+        """capture() on a worker thread, returns a Future of the ScopeTraces (analyzed if analyze)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PseudoScopeCapture')
+
+        def run():
+            result = self.capture(n, **kwargs)
+            return result.analyze() if analyze else result
+        return self._executor.submit(run)
+
+    def cancelCapture(self):
+        """ends the running capture, which returns the traces collected so far"""
+        with self._cond:
+            self._capCancel = True
+            self._cond.notify_all()
+
+    def _acceptFrame(self, frame):
+        rxTime = time.perf_counter()
+        overhead = self.headerBytes + self.footerBytes
+
+        with frame.lock():
+            with self._cond:
+                self._traceCount += 1
+                if self._capCount >= self._capN:
+                    return
+                size = frame.getPayload()
+                if frame.getError() != 0 or size <= overhead or (size - overhead) % 4:
+                    self._badCount += 1
+                    return
+                length = (size - overhead) // 4
+                if self._capTraces is None:
+                    self._capTraces = np.empty((self._capN, 2, length), dtype=np.uint16)
+                elif self._capTraces.shape[2] != length:
+                    self._badCount += 1
+                    return
+                # the A and B halves land in place as the (2, L) row of the trace
+                frame.read(self._capTraces[self._capCount], self.headerBytes)
+                self._capTimes[self._capCount] = rxTime
+                self._capCount += 1
+                self._cond.notify_all()
+
+    def _stop(self):
+        self.cancelCapture()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        super()._stop()
+
     @staticmethod
     def frequencyConverter(self):
         def func(dev, var):
@@ -0,0 +1,277 @@
+#-----------------------------------------------------------------------------
+# Title      : ePixQuad parameter scan engine
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# Runs a declarative list of steps, each one a set of register settings and
+# per ASIC operations (matrix patterns) followed by the acquisition of a
+# number of frames counted on the data stream. The triggers stop once that
+# count is reached, frames still in flight also belong to the step, so a step
+# holds at least the requested frames. All steps go to one data file with a
+# JSON metadata record per step boundary on METADATA_CHANNEL and a
+# <dataFile>.index.json sidecar. Its 'written' count of each step is the
+# number of VC0 frames in the file, counted by the writer channel.
+#
+# A step is a dict:
+#    name      : step name
+#    frames    : number of frames, default ScanEngine.framesPerStep
+#    registers : {'AcqCore.AsicAcqWidth': 20000, ...} paths relative to the root
+#    asic      : [('trbit', True), matrixClear, ('PulserR', True), ...]
+#                operations applied in order to every enabled ASIC, a
+#                callable item returns a list of operations
+#    metadata  : optional dict copied to the index
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.stream as ris
+import pyrogue as pr
+import json
+import threading
+import time
+
+# Writer channel of the step metadata records, VC0/2/3 data use channels 1 to 3
+METADATA_CHANNEL = 0x8
+
+# Writer channel of the VC0 data frames
+DATA_CHANNEL = 0x1
+
+# Registers after which the queued ASIC writes are flushed
+BARRIER_REGISTERS = ('PulserR',)
+
+def bankColumn(col):
+    """ColCounter value selecting one column of one bank"""
+    return (0x700, 0x680, 0x580, 0x380)[col // 48] + col % 48
+
+def matrixClear():
+    """same sequence as Epix10kaAsic.ClearMatrix"""
+    ops = []
+    for col in range(48):
+        ops += [('PrepareMultiConfig', 0), ('ColCounter', col), ('WriteColData', 0)]
+    ops.append(('CmdPrepForRead', 0))
+    return ops
+
+def matrixFill(value):
+    """writes value to every pixel"""
+    return [('PrepareMultiConfig', 0), ('WriteMatrixData', value)]
+
+def matrixGrid(period, x, y, value, rows=175, cols=192):
+    """writes value to the pixels with row % period == x and col % period == y"""
+    ops = [('CmdPrepForRead', 0), ('PrepareMultiConfig', 0)]
+    for col in range(y, cols, period):
+        for row in range(x, rows, period):
+            ops += [('ColCounter', bankColumn(col)), ('RowCounter', row), ('WritePixelData', value)]
+    ops.append(('CmdPrepForRead', 0))
+    return ops
+
+
+class FrameCounter(ris.Slave):
+    """Counts the received frames, waitFor() blocks until a count is reached"""
+
+    def __init__(self):
+        ris.Slave.__init__(self)
+        self._cond = threading.Condition()
+        self.count = 0
+        self.errors = 0
+        self.lastTime = 0.0
+
+    def _acceptFrame(self, frame):
+        with frame.lock():
+            error = frame.getError()
+        with self._cond:
+            self.lastTime = time.monotonic()
+            if error != 0:
+                self.errors += 1
+                return
+            self.count += 1
+            self._cond.notify_all()
+
+    def waitFor(self, count, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.count >= count, timeout)
+
+
+class MetadataSource(ris.Master):
+    """Sends JSON records into the data file"""
+
+    def __init__(self):
+        ris.Master.__init__(self)
+
+    def send(self, record):
+        data = bytearray(json.dumps(record).encode())
+        frame = self._reqFrame(len(data), True)
+        frame.write(data, 0)
+        self._sendFrame(frame)
+
+
+class ScanEngine(object):
+    """Applies scan steps and acquires at least a number of frames per step"""
+
+    def __init__(self, root, framesPerStep=1000, timeout=None, settleTime=0.1):
+        self._root = root
+        self.framesPerStep = framesPerStep
+
+        # timeout = None waits twice the frames at the auto trigger rate
+        self.timeout = timeout
+
+        # quiet time after the triggers stop before the step is closed
+        self.settleTime = settleTime
+
+        self.counter = FrameCounter()
+        root.pgpVc0 >> self.counter
+
+        # Top built with enWriter, None otherwise
+        self.writer = root.nodes.get('dataWriter')
+        self.metadata = None
+        if self.writer is not None:
+            self.metadata = MetadataSource()
+            pr.streamConnect(self.metadata, self.writer.getChannel(METADATA_CHANNEL))
+
+        self.index = []
+
+    ##########################
+    # Step preparation
+    ##########################
+
+    def compile(self, step):
+        """resolves the register paths of a step, raises on unknown registers"""
+        plan = {
+            'name': step['name'],
+            'frames': step.get('frames', self.framesPerStep),
+            'registers': [],
+            'asic': [],
+        }
+        for op in step.get('asic', []):
+            if callable(op):
+                plan['asic'] += op()
+            else:
+                plan['asic'].append(op)
+        for path, value in step.get('registers', {}).items():
+            node = self._root.getNode(f'{self._root.name}.{path}')
+            if node is None:
+                raise KeyError(f'Step {step["name"]}: unknown register {path}')
+            plan['registers'].append((node, value))
+        asicNodes = self._root.Epix10kaSaci[0].nodes
+        for name in {name for name, value in plan['asic']}:
+            if name not in asicNodes:
+                raise KeyError(f'Step {step["name"]}: unknown ASIC register {name}')
+        return plan
+
+    def apply(self, plan):
+        """writes the registers then runs the ASIC operations on every enabled ASIC"""
+        with self._root.writeBatch() as batch:
+            for node, value in plan['registers']:
+                batch.set(node, value)
+
+        def asicOps(i, asic):
+            with self._root.writeBatch() as batch:
+                for name, value in plan['asic']:
+                    batch.set(asic.nodes[name], value)
+                    if name in BARRIER_REGISTERS:
+                        batch.barrier()
+
+        if plan['asic']:
+            self._root.forEachAsic(asicOps)
+
+    ##########################
+    # Acquisition
+    ##########################
+
+    def startTrigger(self):
+        self._root.SystemRegs.AutoTrigEn.set(True)
+
+    def stopTrigger(self):
+        self._root.SystemRegs.AutoTrigEn.set(False)
+
+    def _stepTimeout(self, frames):
+        if self.timeout is not None:
+            return self.timeout
+        rate = self._root.SystemRegs.AutoTrigFreqHz.get()
+        return 10.0 + 2.0 * frames / rate if rate > 0 else None
+
+    def _writerCounts(self):
+        """(file records, VC0 frames) written so far, None without a data writer"""
+        if self.writer is None:
+            return None
+        return self.writer.FrameCount.get(), self.writer.getChannel(DATA_CHANNEL).getFrameCount()
+
+    def acquire(self, plan):
+        """acquires at least plan['frames'] frames, returns the index entry of the step
+
+        'received' counts the VC0 frames arriving from the link, ahead of the
+        writer FIFO which may drop frames. 'written' counts the VC0 frames
+        stored in the file and is the authoritative count of the step, its
+        frames are the channel DATA_CHANNEL records among the file records
+        firstRecord to lastRecord - 1, which also hold VC2/VC3 frames.
+        """
+        entry = {'name': plan['name'], 'frames': plan['frames']}
+        if self.metadata is not None:
+            self.metadata.send({'record': 'stepStart', 'step': len(self.index), 'name': plan['name'], 'frames': plan['frames']})
+        start = self._writerCounts()
+
+        first = self.counter.count
+        entry['startTime'] = time.time()
+        self.startTrigger()
+        received = self.counter.waitFor(first + plan['frames'], self._stepTimeout(plan['frames']))
+        self.stopTrigger()
+
+        # frames still in flight belong to this step
+        while time.monotonic() - self.counter.lastTime < self.settleTime:
+            time.sleep(self.settleTime)
+
+        entry['stopTime'] = time.time()
+        entry['received'] = self.counter.count - first
+        end = self._writerCounts()
+        if end is not None:
+            entry['firstRecord'] = start[0]
+            entry['lastRecord'] = end[0]
+            entry['written'] = end[1] - start[1]
+        if self.metadata is not None:
+            self.metadata.send({'record': 'stepEnd', 'step': len(self.index), 'name': plan['name'],
+                                'received': entry['received'], 'written': entry.get('written')})
+        if not received:
+            raise TimeoutError(f'Step {plan["name"]}: {entry["received"]} of {plan["frames"]} frames received')
+        return entry
+
+    def run(self, steps, dataFile=None, callback=None):
+        """runs the steps, every step is compiled and validated before the first acquisition
+
+        The configuration of step k+1 is not overlapped with the tail of step k:
+        its register and ASIC writes would reach the ASICs while frames of step k
+        are still read out, and those frames would be taken with mixed settings.
+        A step is configured once the previous one has settled, its writes go out
+        as posted write batches to keep that gap short.
+        """
+        steps = list(steps)
+        plans = [self.compile(step) for step in steps]
+
+        if dataFile is not None:
+            if self.writer is None:
+                raise RuntimeError('A dataFile needs a root with a dataWriter (enWriter)')
+            self.writer.DataFile.set(dataFile)
+            self.writer.Open()
+
+        self.index = []
+        self.stopTrigger()
+        try:
+            for k, plan in enumerate(plans):
+                self.apply(plan)
+                entry = self.acquire(plan)
+                entry['step'] = k
+                entry['registers'] = steps[k].get('registers', {})
+                entry['metadata'] = steps[k].get('metadata', {})
+                self.index.append(entry)
+                if callback is not None:
+                    callback(entry)
+        finally:
+            self.stopTrigger()
+            if dataFile is not None:
+                self.writer.Close()
+                with open(dataFile + '.index.json', 'w') as f:
+                    json.dump({'dataFile': dataFile, 'metadataChannel': METADATA_CHANNEL, 'steps': self.index}, f, indent=2)
+
+        return self.index
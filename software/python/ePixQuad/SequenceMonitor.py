@@ -0,0 +1,238 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue base module - Frame Sequence Monitor Device
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.stream as ris
+import pyrogue as pr
+import struct
+import time
+
+class SequenceMonitor(pr.Device,ris.Slave):
+    """Tracks acqNum and sequence counter gaps and the inter-arrival time of the data frames"""
+
+    # Inter-arrival histogram bins, bin n counts the intervals below 2^n us
+    histogramBins = 24
+
+    def __init__(self,vc=0,**kwargs):
+
+        pr.Device.__init__(self, **kwargs)
+        ris.Slave.__init__(self)
+
+        # Header VC of the monitored frames, the others are only counted
+        self._vc = vc
+
+        # Header dwords 0 (VC), 1 (acqNum) and 2 (sequence counter)
+        self._header = bytearray(12)
+
+        # Firmware drop counters read back next to the host counters, see setDropVariables()
+        self._dropVariables = []
+
+        self._resetCounters()
+
+        self.add(pr.LocalVariable(
+            name         = 'FrameCount',
+            description  = 'Monitored frames',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._frameCount,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'FrameRate',
+            description  = 'Monitored frame rate',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'Hz',
+            disp         = '{:.1f}',
+            pollInterval = 1,
+            localGet     = self._frameRate,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'OtherFrameCount',
+            description  = 'Frames of other VCs, errored or shorter than the header',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._otherCount,
+        ))
+
+        for key, label in (('Acq', 'acqNum'), ('Seq', 'sequence counter')):
+            self.add(pr.LocalVariable(
+                name         = f'{key}GapCount',
+                description  = f'Steps of the {label} above one',
+                mode         = 'RO',
+                value        = 0,
+                pollInterval = 1,
+                localGet     = lambda key=key: self._counts[key][0],
+            ))
+
+            self.add(pr.LocalVariable(
+                name         = f'{key}MissingCount',
+                description  = f'Frames missing from the {label} gaps',
+                mode         = 'RO',
+                value        = 0,
+                pollInterval = 1,
+                localGet     = lambda key=key: self._counts[key][1],
+            ))
+
+            self.add(pr.LocalVariable(
+                name         = f'{key}DuplicateCount',
+                description  = f'Frames repeating the previous {label}',
+                mode         = 'RO',
+                value        = 0,
+                pollInterval = 1,
+                localGet     = lambda key=key: self._counts[key][2],
+            ))
+
+            self.add(pr.LocalVariable(
+                name         = f'{key}BackwardCount',
+                description  = f'Frames with a {label} below the previous one',
+                mode         = 'RO',
+                value        = 0,
+                pollInterval = 1,
+                localGet     = lambda key=key: self._counts[key][3],
+            ))
+
+        self.add(pr.LocalVariable(
+            name         = 'LastAcqNum',
+            description  = 'acqNum of the last monitored frame',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._last['Acq'] or 0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'LastSeqNum',
+            description  = 'Sequence counter of the last monitored frame',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._last['Seq'] or 0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'ArrivalAvg',
+            description  = 'Average time between monitored frames since the last count reset',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'us',
+            disp         = '{:.1f}',
+            pollInterval = 1,
+            localGet     = lambda: (1e6 * self._arrivalSum / self._arrivalCnt) if self._arrivalCnt else 0.0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'ArrivalMax',
+            description  = 'Maximum time between monitored frames since the last count reset',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'us',
+            disp         = '{:.1f}',
+            pollInterval = 1,
+            localGet     = lambda: 1e6 * self._arrivalMax,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'ArrivalHistogram',
+            description  = 'Time between monitored frames, bin n counts the intervals below 2^n us',
+            mode         = 'RO',
+            value        = [0] * self.histogramBins,
+            pollInterval = 1,
+            localGet     = lambda: list(self._histogram),
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'FwDropFrameCount',
+            description  = 'Sum of the firmware drop counters given to setDropVariables()',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: sum(var.get() for var in self._dropVariables),
+        ))
+
+    def setDropVariables(self, variables):
+        """firmware drop counters read and summed by FwDropFrameCount"""
+        self._dropVariables = list(variables)
+
+    def _resetCounters(self):
+        self._frameCount = 0
+        self._otherCount = 0
+        # gap, missing, duplicate, backward
+        self._counts = {'Acq': [0, 0, 0, 0], 'Seq': [0, 0, 0, 0]}
+        self._last = {'Acq': None, 'Seq': None}
+        self._lastTime = None
+        self._arrivalSum = 0.0
+        self._arrivalCnt = 0
+        self._arrivalMax = 0.0
+        self._histogram = [0] * self.histogramBins
+        self._rateLast = None
+
+    def countReset(self):
+        self._resetCounters()
+        super().countReset()
+
+    def _frameRate(self):
+        """frames per second since the previous poll"""
+        now = time.monotonic()
+        last = self._rateLast
+        self._rateLast = (now, self._frameCount)
+        if last is None or now <= last[0] or self._frameCount < last[1]:
+            return 0.0
+        return (self._frameCount - last[1]) / (now - last[0])
+
+    def _step(self, key, value):
+        last = self._last[key]
+        self._last[key] = value
+        if last is None:
+            return
+        # counters wrap at 32 bits, a step above 2^31 is a step back
+        step = (value - last) & 0xFFFFFFFF
+        counts = self._counts[key]
+        if step == 1:
+            return
+        if step == 0:
+            counts[2] += 1
+        elif step < 0x80000000:
+            counts[0] += 1
+            counts[1] += step - 1
+        else:
+            counts[3] += 1
+
+    def _acceptFrame(self, frame):
+        rxTime = time.perf_counter()
+
+        # Only the header is copied out of the frame
+        with frame.lock():
+            if frame.getError() != 0 or frame.getPayload() < len(self._header):
+                self._otherCount += 1
+                return
+            frame.read(self._header, 0)
+
+        vc, acqNum, seqNum = struct.unpack('<III', self._header)
+        if (vc & 0xF) != self._vc:
+            self._otherCount += 1
+            return
+
+        self._frameCount += 1
+        self._step('Acq', acqNum)
+        self._step('Seq', seqNum)
+
+        if self._lastTime is not None:
+            interval = rxTime - self._lastTime
+            self._arrivalSum += interval
+            self._arrivalCnt += 1
+            if interval > self._arrivalMax:
+                self._arrivalMax = interval
+            self._histogram[min(int(interval * 1e6).bit_length(), self.histogramBins - 1)] += 1
+        self._lastTime = rxTime
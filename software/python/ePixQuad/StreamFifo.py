@@ -0,0 +1,285 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue base module - Bounded Stream FIFO Device
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.stream as ris
+import pyrogue as pr
+import collections
+import threading
+import time
+
+class StreamFifo(pr.Device,ris.Slave,ris.Master):
+    """Stream FIFO bounded by a frame depth and a byte budget, forwarding from a worker thread"""
+
+    _dropPolicies = ('drop', 'block')
+
+    def __init__(self,maxDepth=100,maxBytes=0,dropPolicy='drop',zeroCopy=True,threaded=True,native=False,**kwargs):
+
+        pr.Device.__init__(self, **kwargs)
+        ris.Slave.__init__(self)
+        ris.Master.__init__(self)
+
+        if dropPolicy not in self._dropPolicies:
+            raise ValueError(f'Invalid dropPolicy {dropPolicy}, expected one of {self._dropPolicies}')
+
+        # maxDepth / maxBytes = 0 disable the corresponding limit
+        self._maxDepth = maxDepth
+        self._maxBytes = maxBytes
+        self._blocking = (dropPolicy == 'block')
+
+        # zeroCopy queues the received frame, otherwise the payload is copied to a new frame
+        self._zeroCopy = zeroCopy
+
+        # native = True queues in a rogue Fifo when no byte budget and no blocking are asked
+        # for, connect() then routes the frames through it without a python hop. The
+        # limits are fixed, the queue depth high water mark is sampled by the poller.
+        self._native = None
+        if native and maxBytes == 0 and not self._blocking:
+            self._native = ris.Fifo(maxDepth, 0, zeroCopy)
+
+        # threaded = False forwards inline from the rogue callback
+        self._threaded = threaded and self._native is None
+
+        self._queue = collections.deque()
+        self._queueBytes = 0
+        self._queueCond = threading.Condition()
+        self._worker = None
+        self._running = False
+
+        self._highWater = 0
+        self._highWaterBytes = 0
+        self._dropCount = 0
+        self._latencySum = 0.0
+        self._latencyCnt = 0
+        self._latencyMax = 0.0
+
+        self.add(pr.LocalVariable(
+            name         = 'MaxDepth',
+            description  = 'Maximum number of queued frames, 0 for no limit',
+            value        = maxDepth,
+            mode         = 'RW' if self._native is None else 'RO',
+            localSet     = self._maxDepthSet,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'MaxBytes',
+            description  = 'Maximum number of queued payload bytes, 0 for no limit',
+            value        = maxBytes,
+            mode         = 'RW' if self._native is None else 'RO',
+            localSet     = self._maxBytesSet,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'DropPolicy',
+            description  = 'Drop new frames or block the source when the queue is full',
+            enum         = {0: 'Drop', 1: 'Block'},
+            value        = self._dropPolicies.index(dropPolicy),
+            mode         = 'RW' if self._native is None else 'RO',
+            localSet     = self._dropPolicySet,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'QueueDepth',
+            description  = 'Frames waiting in the queue',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = self._queueDepth,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'QueueBytes',
+            description  = 'Payload bytes waiting in the queue',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._queueBytes,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'QueueHighWater',
+            description  = 'Maximum queue depth since the last count reset',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._highWater,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'QueueHighWaterBytes',
+            description  = 'Maximum queued bytes since the last count reset',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._highWaterBytes,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'DropCount',
+            description  = 'Frames dropped because the queue was full',
+            mode         = 'RO',
+            value        = 0,
+            pollInterval = 1,
+            localGet     = lambda: self._dropCount + (self._native.dropCnt() if self._native is not None else 0),
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'LatencyAvg',
+            description  = 'Average rx to tx latency since the last count reset',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'us',
+            disp         = '{:.1f}',
+            pollInterval = 1,
+            localGet     = lambda: (1e6 * self._latencySum / self._latencyCnt) if self._latencyCnt else 0.0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'LatencyMax',
+            description  = 'Maximum rx to tx latency since the last count reset',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'us',
+            disp         = '{:.1f}',
+            pollInterval = 1,
+            localGet     = lambda: 1e6 * self._latencyMax,
+        ))
+
+    def countReset(self):
+        if self._native is not None:
+            self._native.clearCnt()
+        with self._queueCond:
+            self._highWater = self._queueDepth()
+            self._highWaterBytes = self._queueBytes
+        self._dropCount = 0
+        self._latencySum = 0.0
+        self._latencyCnt = 0
+        self._latencyMax = 0.0
+        super().countReset()
+
+    def connect(self, source, dest):
+        """source >> queue >> dest, through the rogue Fifo when it backs the queue"""
+        if self._native is not None:
+            pr.streamConnect(source, self._native)
+            pr.streamConnect(self._native, dest)
+        else:
+            pr.streamConnect(source, self)
+            pr.streamConnect(self, dest)
+
+    def _queueDepth(self):
+        if self._native is None:
+            return len(self._queue)
+        depth = self._native.size()
+        self._highWater = max(self._highWater, depth)
+        return depth
+
+    def _maxDepthSet(self, value):
+        with self._queueCond:
+            self._maxDepth = value
+            self._queueCond.notify_all()
+
+    def _maxBytesSet(self, value):
+        with self._queueCond:
+            self._maxBytes = value
+            self._queueCond.notify_all()
+
+    def _dropPolicySet(self, value):
+        with self._queueCond:
+            self._blocking = (value == 1)
+            self._queueCond.notify_all()
+
+    def _full(self, size):
+        if self._maxDepth > 0 and len(self._queue) >= self._maxDepth:
+            return True
+        # a single frame above the byte budget is still accepted by an empty queue
+        return self._maxBytes > 0 and len(self._queue) > 0 and self._queueBytes + size > self._maxBytes
+
+    def _acceptFrame(self, frame):
+        self._pushFrame(frame, time.perf_counter())
+
+    def _pushFrame(self, frame, rxTime):
+        with frame.lock():
+            size = frame.getPayload()
+            if not self._zeroCopy:
+                fullData = bytearray(size)
+                frame.read(fullData,0)
+
+        # Copying releases the upstream buffer before the frame is queued
+        if not self._zeroCopy:
+            frame = self._reqFrame(size, True)
+            frame.write(fullData,0)
+
+        with self._queueCond:
+            while self._running and self._full(size):
+                if not self._blocking:
+                    self._dropCount += 1
+                    return
+                self._queueCond.wait()
+
+            if self._running:
+                self._queue.append((frame, size, rxTime))
+                self._queueBytes += size
+                self._highWater = max(self._highWater, len(self._queue))
+                self._highWaterBytes = max(self._highWaterBytes, self._queueBytes)
+                self._queueCond.notify_all()
+                return
+
+        # Without a running worker the frame is forwarded inline
+        self._forward(frame, rxTime)
+
+    def _forward(self, frame, rxTime):
+        self._sendFrame(frame)
+
+        latency = time.perf_counter() - rxTime
+        self._latencySum += latency
+        self._latencyCnt += 1
+        if latency > self._latencyMax:
+            self._latencyMax = latency
+
+    def _run(self):
+        while True:
+            with self._queueCond:
+                while self._running and not self._queue:
+                    self._queueCond.wait()
+                if not self._queue:
+                    return
+                frame, size, rxTime = self._queue.popleft()
+                self._queueBytes -= size
+                self._queueCond.notify_all()
+
+            self._forward(frame, rxTime)
+
+    def _start(self):
+        super()._start()
+        if self._threaded:
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name=f'{self.path}.worker', daemon=True)
+            self._worker.start()
+
+    def _stop(self):
+        if self._worker is not None:
+            # the worker drains the queue before exiting
+            with self._queueCond:
+                self._running = False
+                self._queueCond.notify_all()
+            self._worker.join()
+            self._worker = None
+        super()._stop()
+
+    # source >> destination
+    def __rshift__(self,other):
+        pr.streamConnect(self,other)
+        return other
+
+    # destination << source
+    def __lshift__(self,other):
+        pr.streamConnect(other,self)
+        return other
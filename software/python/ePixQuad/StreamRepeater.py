@@ -10,95 +10,149 @@
 # contained in the LICENSE.txt file.
 #-----------------------------------------------------------------------------
 
-import rogue.interfaces.stream as ris
 import pyrogue as pr
+import threading
 import time
 
-class StreamRepeater(pr.Device,ris.Slave,ris.Master):
-    def __init__(self,enableOnStart=True,**kwargs):
+from ePixQuad.StreamFifo import StreamFifo
 
-        pr.Device.__init__(self, **kwargs)
-        ris.Slave.__init__(self)
-        ris.Master.__init__(self)
+class StreamRepeater(StreamFifo):
+    def __init__(self,enableOnStart=True,zeroCopy=True,maxQueueDepth=0,maxQueueBytes=0,dropPolicy='block',**kwargs):
+
+        # Without a depth or byte limit frames are forwarded inline from the rogue callback,
+        # otherwise they are queued and forwarded by a worker thread
+        super().__init__(
+            maxDepth   = maxQueueDepth,
+            maxBytes   = maxQueueBytes,
+            dropPolicy = dropPolicy,
+            zeroCopy   = zeroCopy,
+            threaded   = (maxQueueDepth > 0 or maxQueueBytes > 0),
+            **kwargs)
 
         self._enableOnStart = enableOnStart
+        self._stopped = False
+
+        # Set while RxEnable is true, the rx callback blocks on it to back pressure the source
+        self._rxEnabled = threading.Event()
+        self._rxEnabled.set()
+
+        # Counters are plain integers updated in the rx callback and
+        # published to the variables by the poller
+        self._frameCount = 0
+        self._errorCount = 0
+        self._byteCount = 0
+        self._rateLast = {}
 
         self.add(pr.LocalVariable(
             name        = 'RxEnable',
             description = 'Frame Rx Enable',
             value       = True,
+            localSet    = self._rxEnableSet,
         ))
 
         self.add(pr.LocalVariable(
             name         = 'FrameCount',
             description  = 'Frame Rx Counter',
+            mode         = 'RO',
             value        = 0,
             pollInterval = 1,
+            localGet     = lambda: self._frameCount,
         ))
 
         self.add(pr.LocalVariable(
             name         = 'ErrorCount',
             description  = 'Frame Error Counter',
+            mode         = 'RO',
             value        = 0,
             pollInterval = 1,
+            localGet     = lambda: self._errorCount,
         ))
 
         self.add(pr.LocalVariable(
             name         = 'ByteCount',
             description  = 'Byte Rx Counter',
+            mode         = 'RO',
             value        = 0,
             pollInterval = 1,
+            localGet     = lambda: self._byteCount,
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'FrameRate',
+            description  = 'Frame Rx Rate',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'Hz',
+            disp         = '{:.1f}',
+            pollInterval = 1,
+            localGet     = lambda: self._rate('frame', self._frameCount),
+        ))
+
+        self.add(pr.LocalVariable(
+            name         = 'ByteRate',
+            description  = 'Byte Rx Rate',
+            mode         = 'RO',
+            value        = 0.0,
+            units        = 'MB/s',
+            disp         = '{:.3f}',
+            pollInterval = 1,
+            localGet     = lambda: self._rate('byte', self._byteCount) * 1e-6,
         ))
 
     def countReset(self):
-        self.FrameCount.set(0)
-        self.ErrorCount.set(0)
-        self.ByteCount.set(0)
+        self._frameCount = 0
+        self._errorCount = 0
+        self._byteCount = 0
+        self._rateLast = {}
         super().countReset()
 
+    def _rate(self, key, count):
+        """counts per second since the previous poll of the same rate"""
+        now = time.monotonic()
+        last = self._rateLast.get(key)
+        self._rateLast[key] = (now, count)
+        if last is None or now <= last[0] or count < last[1]:
+            return 0.0
+        return (count - last[1]) / (now - last[0])
+
+    def _rxEnableSet(self, value):
+        # a stopped repeater never blocks the source
+        if value or self._stopped:
+            self._rxEnabled.set()
+        else:
+            self._rxEnabled.clear()
+
     def _acceptFrame(self, frame):
         # Check for back pressuring condition
-        while (self.RxEnable.value() is False):
-            time.sleep(1.0)
+        self._rxEnabled.wait()
+        if self._stopped:
+            return
+
+        rxTime = time.perf_counter()
 
         # Lock frame
         with frame.lock():
 
             # Drop errored frames
             if frame.getError() != 0:
-                with self.ErrorCount.lock:
-                    self.ErrorCount.set(self.ErrorCount.value() + 1, write=False)
-
+                self._errorCount += 1
                 return
 
-            with self.FrameCount.lock:
-                self.FrameCount.set(self.FrameCount.value() + 1, write=False)
-
-            with self.ByteCount.lock:
-                self.ByteCount.set(self.ByteCount.value() + frame.getPayload(), write=False)
+            self._frameCount += 1
+            self._byteCount += frame.getPayload()
 
-            # Repeat the data
-            size = frame.getPayload()
-            fullData = bytearray(size)
-            frame.read(fullData,0)
-            txFrame = self._reqFrame(size, True)
-            txFrame.write(fullData,0)
-            self._sendFrame(txFrame)
+        # Repeat the data
+        self._pushFrame(frame, rxTime)
 
     def _start(self):
         super()._start()
+        # a restarted repeater accepts frames again, gated by RxEnable
+        self._stopped = False
+        self._rxEnableSet(self.RxEnable.value())
         self.RxEnable.set(value=self._enableOnStart)
 
     def _stop(self):
         self.RxEnable.set(value=False)
+        self._stopped = True
+        self._rxEnabled.set()
         super()._stop()
-
-    # source >> destination
-    def __rshift__(self,other):
-        pr.streamConnect(self,other)
-        return other
-
-    # destination << source
-    def __lshift__(self,other):
-        pr.streamConnect(other,self)
-        return other
@@ -8,9 +8,11 @@
 # may be copied, modified, propagated, or distributed except according to
 # the terms contained in the LICENSE.txt file.
 ##############################################################################
+import contextlib
 import os.path
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 
 import axipcie as pcie
@@ -37,6 +39,15 @@ import surf.xilinx as xil
 
 import ePixQuad
 
+# Subsystem selection bits for the enDevMask argument of Top
+DEV_CORE = 0x01     # AxiVersion, SystemRegs, AcqCore, RdoutCore, PseudoScopeCore
+DEV_ASIC = 0x02     # Epix10kaSaci[0:15], SaciConfigCore
+DEV_ADC = 0x04      # Ad9249Config, Ad9249Readout, Ad9249Tester
+DEV_MONITOR = 0x08  # VguardDac, EpixQuadMonitor
+DEV_TEST = 0x10     # PrbsTx, AxiMemTester
+DEV_PROM = 0x20     # CypressS25Fl
+DEV_ALL = 0x3F
+
 
 class Top(pr.Root):
 
@@ -50,6 +61,11 @@ class Top(pr.Root):
                  enVcMask=0xf,
                  enWriter=True,
                  enPrbs=True,
+                 enDevMask=DEV_ALL,
+                 fifoDepth=100,
+                 fifoMaxBytes=0,
+                 fifoDropPolicy='drop',
+                 repeaterQueueDepth=0,
                  **kwargs):
 
         super().__init__(name=name, description=description, **kwargs)
@@ -61,6 +77,10 @@ class Top(pr.Root):
 
         ######################################################################
 
+        # In-process register emulator, see ePixQuad.Emulator
+        if (hwType == 'emulation'):
+            self.emulator = ePixQuad.EpixQuadEmulator()
+
         # VC0: Data & cmds
         # VC1: Registers for ePix board
         # VC2: PseudoScope
@@ -82,6 +102,13 @@ class Top(pr.Root):
                     raise Exception('rogue.hardware.pgp not supported in Rogue 5.18')
                     kwargs['timeout'] = 5000000  # 5.0 seconds default
                     self.sim = False
+                elif (hwType == 'emulation'):
+                    # VC0 commands act as triggers of the register emulator
+                    setattr(
+                        self, f'pgpVc{i}',
+                        ePixQuad.EpixQuadEmulatorStream(
+                            self.emulator if i == 0 else None))
+                    self.sim = False
                 else:
                     setattr(
                         self, f'pgpVc{i}',
@@ -92,24 +119,24 @@ class Top(pr.Root):
 
         ######################################################################
 
-        fifo_vc0 = rogue.interfaces.stream.Fifo(100, 0, True)
-        fifo_vc1 = rogue.interfaces.stream.Fifo(100, 0, True)
-        fifo_vc2 = rogue.interfaces.stream.Fifo(100, 0, True)
-        fifo_vc3 = rogue.interfaces.stream.Fifo(100, 0, True)
-        # for i in range(4):
-        #     # Create a Fifo with maxDepth=100, trimSize=0, noCopy=True
-        #     self.fifo[i] = rogue.interfaces.stream.Fifo(100, 0, True)
-
         # File writer
         if enWriter:
-            dataWriter = pr.utilities.fileio.StreamWriter()
+            dataWriter = pr.utilities.fileio.StreamWriter(name='dataWriter')
             self.add(dataWriter)
-            if enVcMask & 1:
-                self.pgpVc0 >> fifo_vc0 >> dataWriter.getChannel(0x1)
-            if enVcMask & 4:
-                self.pgpVc2 >> fifo_vc2 >> dataWriter.getChannel(0x2)
-            if enVcMask & 8:
-                self.pgpVc3 >> fifo_vc3 >> dataWriter.getChannel(0x3)
+
+            # Bounded FIFO in front of each writer channel (VC -> writer channel)
+            for vc, channel in ((0, 0x1), (2, 0x2), (3, 0x3)):
+                if enVcMask & (1 << vc):
+                    fifo = ePixQuad.StreamFifo(
+                        name=f'StreamFifoVc{vc}',
+                        maxDepth=fifoDepth,
+                        maxBytes=fifoMaxBytes,
+                        dropPolicy=fifoDropPolicy,
+                        native=True,
+                        expand=False,
+                    )
+                    self.add(fifo)
+                    fifo.connect(getattr(self, f'pgpVc{vc}'), dataWriter.getChannel(channel))
 
         # PRBS
         if enPrbs:
@@ -118,13 +145,16 @@ class Top(pr.Root):
                 pyrogue.streamConnect(self.pgpVc0, prbsRx)
             self.add(prbsRx)
 
-        memMap = rogue.protocols.srp.SrpV3()
+        if (hwType == 'emulation'):
+            memMap = self.emulator
+        else:
+            memMap = rogue.protocols.srp.SrpV3()
 
         # Connect the SRPv3 to PGPv3.VC[0]
         if enVcMask & 1:
             cmdVc1 = rogue.protocols.srp.Cmd()
             cmdVc1 >> self.pgpVc0
-        if enVcMask & 2:
+        if enVcMask & 2 and (hwType != 'emulation'):
             self.pgpVc1 == memMap
         if enVcMask & 8:
             cmdVc3 = rogue.protocols.srp.Cmd()
@@ -144,44 +174,44 @@ class Top(pr.Root):
 
         @self.command()
         def SetAsicMatrixTest():
-            # save TrigEn state and stop
-            self.SystemRegs.enable.set(True)
-            trigEn = self.SystemRegs.TrigEn.get()
-            self.SystemRegs.TrigEn.set(False)
-            # clear matrix in all enabled ASICs
-            for i in range(16):
-                # iterate through enabled (preset) ASICs
-                if self.Epix10kaSaci[i].enable.get() == True:
-                    print('Setting pulsed region in ASIC %d' % i)
+            def setPulsedRegion(i, asic):
+                print('Setting pulsed region in ASIC %d' % i)
+                with self.writeBatch() as batch:
                     # enable automated pulser increment
-                    self.Epix10kaSaci[i].atest.set(True)
-                    self.Epix10kaSaci[i].test.set(True)
+                    batch.set(asic.atest, True)
+                    batch.set(asic.test, True)
                     # toggle reset to make sure pulser starts from 0 everywhere
-                    self.Epix10kaSaci[i].PulserR.set(True)
-                    self.Epix10kaSaci[i].PulserR.set(False)
+                    batch.set(asic.PulserR, True)
+                    batch.set(asic.PulserR, False)
+                    # the pulser reset must be done before the pixels are written
+                    batch.barrier()
                     # pulse arbitrary square region of 3x3 pixels in each bank
                     for x in range(20, 24):
                         for y in range(5, 8):
-                            self.Epix10kaSaci[i].RowCounter(x)
-                            self.Epix10kaSaci[i].ColCounter(y)
-                            self.Epix10kaSaci[i].WritePixelData(1)
-            # restore TrigEn state
-            self.SystemRegs.TrigEn.set(trigEn)
+                            batch.set(asic.RowCounter, x)
+                            batch.set(asic.ColCounter, y)
+                            batch.set(asic.WritePixelData, 1)
+
+            # stop triggers and set the pulsed region in all enabled ASICs
+            with self.triggerStopped():
+                self.forEachAsic(setPulsedRegion)
 
         @self.command()
         def ClearAsicMatrix():
-            # save TrigEn state and stop
-            self.SystemRegs.enable.set(True)
-            trigEn = self.SystemRegs.TrigEn.get()
-            self.SystemRegs.TrigEn.set(False)
-            # clear matrix in all enabled ASICs
-            for i in range(16):
-                if self.Epix10kaSaci[i].enable.get() == True:
-                    self.Epix10kaSaci[i].atest.set(False)
-                    self.Epix10kaSaci[i].test.set(False)
-                    self.Epix10kaSaci[i].ClearMatrix()
-            # restore TrigEn state
-            self.SystemRegs.TrigEn.set(trigEn)
+            def clearMatrix(i, asic):
+                with self.writeBatch() as batch:
+                    batch.set(asic.atest, False)
+                    batch.set(asic.test, False)
+                    # same sequence as Epix10kaAsic.ClearMatrix
+                    for col in range(48):
+                        batch.set(asic.PrepareMultiConfig, 0)
+                        batch.set(asic.ColCounter, col)
+                        batch.set(asic.WriteColData, 0)
+                    batch.set(asic.CmdPrepForRead, 0)
+
+            # stop triggers and clear matrix in all enabled ASICs
+            with self.triggerStopped():
+                self.forEachAsic(clearMatrix)
 
 
 #        @self.command()
@@ -216,183 +246,43 @@ class Top(pr.Root):
 
         @self.command()
         def SetAsicMatrix():
-            # save TrigEn state and stop
-            self.SystemRegs.enable.set(True)
-            trigEn = self.SystemRegs.TrigEn.get()
-            self.SystemRegs.TrigEn.set(False)
-            # clear matrix in all enabled ASICs:q
-            for i in range(16):
-                if self.Epix10kaSaci[i].enable.get() == True:
-                    self.Epix10kaSaci[i].atest.set(False)
-                    self.Epix10kaSaci[i].test.set(False)
-                    self.Epix10kaSaci[i].SetMatrix()
-
-        self.add(
-            ePixQuad.EpixVersion(
-                name='AxiVersion',
-                memBase=memMap,
-                offset=0x00000000,
-                expand=False,
-            ))
-
-        self.add(
-            ePixQuad.SystemRegs(
-                name='SystemRegs',
-                memBase=memMap,
-                offset=0x00100000,
-                expand=False,
-            ))
-
-        self.add(
-            ePixQuad.AcqCore(
-                name='AcqCore',
-                memBase=memMap,
-                offset=0x01000000,
-                expand=False,
-            ))
-
-        self.add(
-            ePixQuad.RdoutCore(
-                name='RdoutCore',
-                memBase=memMap,
-                offset=0x01100000,
-                expand=False,
-            ))
-
-        if not self.sim:
-            self.add(
-                axi.AxiStreamMonAxiL(
-                    name='RdoutStreamMonitoring',
-                    memBase=memMap,
-                    offset=0x01300000,
-                    expand=False,
-                ))
-
-        self.add(
-            ssi.SsiPrbsTx(
-                name='PrbsTx',
-                memBase=memMap,
-                offset=0x01400000,
-                expand=False,
-                enabled=False,
-            ))
-
-        self.add(
-            ePixQuad.PseudoScopeCore(
-                name='PseudoScopeCore',
-                memBase=memMap,
-                offset=0x01200000,
-                expand=False,
-            ))
-
-        if not self.sim:
-            self.add(
-                ePixQuad.VguardDac(
-                    name='VguardDac',
-                    memBase=memMap,
-                    offset=0x00500000,
-                    expand=False,
-                ))
-
-        if not self.sim:
-            self.add(
-                ePixQuad.EpixQuadMonitor(
-                    name='EpixQuadMonitor',
-                    memBase=memMap,
-                    offset=0x00700000,
-                    expand=False,
-                ))
-
-        self.add(
-            axi.AxiMemTester(
-                name='AxiMemTester',
-                memBase=memMap,
-                offset=0x00400000,
-                expand=False,
-                enabled=False,
-            ))
-
-        for i in range(16):
-            asicSaciAddr = [
-                0x04000000, 0x04400000, 0x04800000, 0x04C00000, 0x05000000,
-                0x05400000, 0x05800000, 0x05C00000, 0x06000000, 0x06400000,
-                0x06800000, 0x06C00000, 0x07000000, 0x07400000, 0x07800000,
-                0x07C00000
-            ]
-            self.add(
-                epix.Epix10kaAsic(
-                    name=('Epix10kaSaci[%d]' % i),
-                    memBase=memMap,
-                    offset=asicSaciAddr[i],
-                    enabled=False,
-                    expand=False,
-                ))
-
-        self.add(
-            ePixQuad.SaciConfigCore(
-                name='SaciConfigCore',
-                memBase=memMap,
-                offset=0x08000000,
-                expand=False,
-                enabled=False,
-                simSpeedup=(hwType == 'simulation'),
-            ))
-
-        if (hwType != 'simulation'):
-
-            confAddr = [
-                0x02A00000, 0x02A00800, 0x02A01000, 0x02A01800, 0x02B00000,
-                0x02B00800, 0x02B01000, 0x02B01800, 0x02C00000, 0x02C00800
-            ]
-            for i in range(10):
-                self.add(
-                    analog_devices.Ad9249ConfigGroup(
-                        name=('Ad9249Config[%d]' % i),
-                        memBase=memMap,
-                        offset=confAddr[i],
-                        enabled=False,
-                        expand=False,
-                    ))
-
-        for i in range(10):
-            self.add(
-                analog_devices.Ad9249ReadoutGroup(
-                    name=('Ad9249Readout[%d]' % i),
-                    memBase=memMap,
-                    offset=(0x02000000 + i * 0x00100000),
-                    enabled=False,
-                    expand=False,
-                    fpga='ultrascale',
-                ))
-
-        self.add(
-            ePixQuad.AdcTester(
-                name='Ad9249Tester',
-                memBase=memMap,
-                offset=0x02D00000,
-                enabled=False,
-                expand=False,
-                hidden=False,
-            ))
+            def setMatrix(i, asic):
+                asic.atest.set(False)
+                asic.test.set(False)
+                asic.SetMatrix()
+
+            # stop triggers and set matrix in all enabled ASICs
+            with self.triggerStopped():
+                self.forEachAsic(setMatrix)
+
+        # Build the enabled subsystems now, the others are built on first access
+        self._memMap = memMap
+        self._hwType = hwType
+        self._builtDevMask = 0
+        self._lazyDevMask = DEV_ALL & ~enDevMask
+        self._buildDevices(enDevMask)
 
         #this device enables us to force back pressure
-        self.repeater = ePixQuad.StreamRepeater(expand=False)
+        self.repeater = ePixQuad.StreamRepeater(expand=False, maxQueueDepth=repeaterQueueDepth)
         self.add(self.repeater)
 
         # Connect DMA stream --> repeater
         if enVcMask & 1:
             self.pgpVc0 >> self.repeater
 
-        if (hwType != 'simulation'):
+        # Host side acqNum/sequence gap and inter-arrival monitor of the data frames
+        self.add(ePixQuad.SequenceMonitor(name='SequenceMonitor', expand=False))
+        if enVcMask & 1:
+            self.pgpVc0 >> self.SequenceMonitor
 
-            self.add(
-                cypress.CypressS25Fl(
-                    offset=0x00300000,
-                    memBase=memMap,
-                    expand=False,
-                    addrMode=True,
-                    hidden=True,
-                ))
+        # On disk slow control history, the sources are registered in start()
+        self.add(ePixQuad.MonitorRecorder(name='MonitorRecorder', expand=False))
+
+        # Queue the register writes of the commands as posted transactions
+        self.postedWrites = True
+
+        # ASICs configured concurrently by the matrix commands, 1 runs them in turn
+        self.asicWorkers = 16
 
         # ADC startup parameters
         self.adcRstTime = 0.01
@@ -424,20 +314,20 @@ class Top(pr.Root):
             # Wait 100 ms
             time.sleep(0.1)
 
-            # load trained delays
-            for adc in range(10):
-                newDly = self.allDelays[adc * 9]
-                if newDly >= 0:
-                    self.Ad9249Readout[adc].FrameDelay.set(0x200 + newDly)
-                else:
-                    print("Bad stored delay. Train ADCs!")
-                for lane in range(8):
-                    newDly = self.allDelays[adc * 9 + lane + 1]
+            # load trained delays, the batch is flushed before testing
+            with self.writeBatch() as batch:
+                for adc in range(10):
+                    newDly = self.allDelays[adc * 9]
                     if newDly >= 0:
-                        self.Ad9249Readout[adc].ChannelDelay[lane].set(0x200 +
-                                                                       newDly)
+                        batch.set(self.Ad9249Readout[adc].FrameDelay, 0x200 + newDly)
                     else:
                         print("Bad stored delay. Train ADCs!")
+                    for lane in range(8):
+                        newDly = self.allDelays[adc * 9 + lane + 1]
+                        if newDly >= 0:
+                            batch.set(self.Ad9249Readout[adc].ChannelDelay[lane], 0x200 + newDly)
+                        else:
+                            print("Bad stored delay. Train ADCs!")
 
             # test ADCs and reset if needed
             for adc in range(10):
@@ -610,25 +500,303 @@ class Top(pr.Root):
                         bg='green',
                     )
 
+    # Device names created by every subsystem builder
+    _devSubsystems = {
+        'AxiVersion': DEV_CORE,
+        'SystemRegs': DEV_CORE,
+        'AcqCore': DEV_CORE,
+        'RdoutCore': DEV_CORE,
+        'RdoutStreamMonitoring': DEV_CORE,
+        'PseudoScopeCore': DEV_CORE,
+        'Epix10kaSaci': DEV_ASIC,
+        'SaciConfigCore': DEV_ASIC,
+        'Ad9249Config': DEV_ADC,
+        'Ad9249Readout': DEV_ADC,
+        'Ad9249Tester': DEV_ADC,
+        'VguardDac': DEV_MONITOR,
+        'EpixQuadMonitor': DEV_MONITOR,
+        'PrbsTx': DEV_TEST,
+        'AxiMemTester': DEV_TEST,
+        'CypressS25Fl': DEV_PROM,
+    }
+
+    def __getattr__(self, name):
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            subsys = Top._devSubsystems.get(name, 0)
+            if not (subsys & self.__dict__.get('_lazyDevMask', 0)):
+                raise
+            # the tree is frozen once the root is started
+            if self.__dict__.get('_lazyClosed', False):
+                raise AttributeError(
+                    f'{name} was not built: subsystem 0x{subsys:02x} is not in enDevMask '
+                    '(devices can only be created before start())') from None
+            self._buildDevices(subsys)
+            return super().__getattr__(name)
+
+    def writeBatch(self):
+        """Context issuing register writes as posted transactions, flushed on exit"""
+        return ePixQuad.WriteBatch(syncVar=self.SystemRegs.TrigEn, posted=self.postedWrites)
+
+    @contextlib.contextmanager
+    def triggerStopped(self):
+        """Context saving TrigEn, stopping the triggers and restoring TrigEn on exit"""
+        self.SystemRegs.enable.set(True)
+        trigEn = self.SystemRegs.TrigEn.get()
+        self.SystemRegs.TrigEn.set(False)
+        try:
+            yield
+        finally:
+            self.SystemRegs.TrigEn.set(trigEn)
+
+    def forEachAsic(self, func):
+        """Runs func(i, asic) for every enabled ASIC, concurrently as the SACI buses are independent"""
+        asics = [i for i in range(16) if self.Epix10kaSaci[i].enable.get() == True]
+
+        errors = {}
+        if self.asicWorkers > 1 and len(asics) > 1:
+            with ThreadPoolExecutor(max_workers=self.asicWorkers) as pool:
+                futures = [(i, pool.submit(func, i, self.Epix10kaSaci[i])) for i in asics]
+                for i, future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors[i] = e
+        else:
+            for i in asics:
+                try:
+                    func(i, self.Epix10kaSaci[i])
+                except Exception as e:
+                    errors[i] = e
+
+        # every ASIC is attempted, the failures are reported together
+        if errors:
+            msg = ', '.join(f'ASIC {i}: {e}' for i, e in errors.items())
+            raise Exception(f'{len(errors)} of {len(asics)} ASICs failed: {msg}') from next(iter(errors.values()))
+
+    def start(self, **kwargs):
+        # the tree is frozen by the first start, a restart keeps the registered sources
+        if not self.__dict__.get('_lazyClosed', False):
+            self._lazyClosed = True
+            self._registerMonitorSources()
+        super().start(**kwargs)
+
+    def _registerMonitorSources(self):
+        # firmware frame drops next to the host side gaps
+        if self._builtDevMask & DEV_CORE:
+            self.SequenceMonitor.setDropVariables([
+                self.RdoutCore.sAxisDropFrameCount,
+                self.RdoutCore.mAxisDropFrameCount,
+            ])
+        # slow control history sources
+        if 'EpixQuadMonitor' in self.nodes:
+            self.MonitorRecorder.addSource(self.EpixQuadMonitor.readValues)
+        if self._builtDevMask & DEV_CORE:
+            self.MonitorRecorder.addVariables([
+                self.SystemRegs.TempAlert,
+                self.SystemRegs.TempFault,
+            ])
+
+    def _buildDevices(self, devMask):
+        memMap = self._memMap
+        hwType = self._hwType
+
+        devMask &= ~self._builtDevMask
+        self._builtDevMask |= devMask
+        self._lazyDevMask &= ~devMask
+
+        if devMask & DEV_CORE:
+            self.add(
+                ePixQuad.EpixVersion(
+                    name='AxiVersion',
+                    memBase=memMap,
+                    offset=0x00000000,
+                    expand=False,
+                ))
+
+            self.add(
+                ePixQuad.SystemRegs(
+                    name='SystemRegs',
+                    memBase=memMap,
+                    offset=0x00100000,
+                    expand=False,
+                ))
+
+            self.add(
+                ePixQuad.AcqCore(
+                    name='AcqCore',
+                    memBase=memMap,
+                    offset=0x01000000,
+                    expand=False,
+                ))
+
+            self.add(
+                ePixQuad.RdoutCore(
+                    name='RdoutCore',
+                    memBase=memMap,
+                    offset=0x01100000,
+                    expand=False,
+                ))
+
+            if not self.sim:
+                self.add(
+                    axi.AxiStreamMonAxiL(
+                        name='RdoutStreamMonitoring',
+                        memBase=memMap,
+                        offset=0x01300000,
+                        expand=False,
+                    ))
+
+            self.add(
+                ePixQuad.PseudoScopeCore(
+                    name='PseudoScopeCore',
+                    memBase=memMap,
+                    offset=0x01200000,
+                    expand=False,
+                ))
+
+            # VC2 traces for PseudoScopeCore.capture()
+            if getattr(self, 'pgpVc2', None) is not None:
+                self.pgpVc2 >> self.PseudoScopeCore
+
+        if devMask & DEV_TEST:
+            self.add(
+                ssi.SsiPrbsTx(
+                    name='PrbsTx',
+                    memBase=memMap,
+                    offset=0x01400000,
+                    expand=False,
+                    enabled=False,
+                ))
+
+        if devMask & DEV_MONITOR and not self.sim:
+            self.add(
+                ePixQuad.VguardDac(
+                    name='VguardDac',
+                    memBase=memMap,
+                    offset=0x00500000,
+                    expand=False,
+                ))
+
+            self.add(
+                ePixQuad.EpixQuadMonitor(
+                    name='EpixQuadMonitor',
+                    memBase=memMap,
+                    offset=0x00700000,
+                    expand=False,
+                ))
+
+        if devMask & DEV_TEST:
+            self.add(
+                axi.AxiMemTester(
+                    name='AxiMemTester',
+                    memBase=memMap,
+                    offset=0x00400000,
+                    expand=False,
+                    enabled=False,
+                ))
+
+        if devMask & DEV_ASIC:
+            asicSaciAddr = [
+                0x04000000, 0x04400000, 0x04800000, 0x04C00000, 0x05000000,
+                0x05400000, 0x05800000, 0x05C00000, 0x06000000, 0x06400000,
+                0x06800000, 0x06C00000, 0x07000000, 0x07400000, 0x07800000,
+                0x07C00000
+            ]
+            for i in range(16):
+                self.add(
+                    epix.Epix10kaAsic(
+                        name=('Epix10kaSaci[%d]' % i),
+                        memBase=memMap,
+                        offset=asicSaciAddr[i],
+                        enabled=False,
+                        expand=False,
+                    ))
+
+            self.add(
+                ePixQuad.SaciConfigCore(
+                    name='SaciConfigCore',
+                    memBase=memMap,
+                    offset=0x08000000,
+                    expand=False,
+                    enabled=False,
+                    simSpeedup=(hwType == 'simulation'),
+                ))
+
+        if devMask & DEV_ADC:
+            if (hwType != 'simulation'):
+
+                confAddr = [
+                    0x02A00000, 0x02A00800, 0x02A01000, 0x02A01800, 0x02B00000,
+                    0x02B00800, 0x02B01000, 0x02B01800, 0x02C00000, 0x02C00800
+                ]
+                for i in range(10):
+                    self.add(
+                        analog_devices.Ad9249ConfigGroup(
+                            name=('Ad9249Config[%d]' % i),
+                            memBase=memMap,
+                            offset=confAddr[i],
+                            enabled=False,
+                            expand=False,
+                        ))
+
+            for i in range(10):
+                self.add(
+                    analog_devices.Ad9249ReadoutGroup(
+                        name=('Ad9249Readout[%d]' % i),
+                        memBase=memMap,
+                        offset=(0x02000000 + i * 0x00100000),
+                        enabled=False,
+                        expand=False,
+                        fpga='ultrascale',
+                    ))
+
+            self.add(
+                ePixQuad.AdcTester(
+                    name='Ad9249Tester',
+                    memBase=memMap,
+                    offset=0x02D00000,
+                    enabled=False,
+                    expand=False,
+                    hidden=False,
+                ))
+
+        if devMask & DEV_PROM and (hwType not in ('simulation', 'emulation')):
+            self.add(
+                cypress.CypressS25Fl(
+                    offset=0x00300000,
+                    memBase=memMap,
+                    expand=False,
+                    addrMode=True,
+                    hidden=True,
+                ))
+
     @staticmethod
     def resetAdc(self, adc):
 
-        print('Reseting ADC deserializer %d ... ' % (adc), end='')
-        self.SystemRegs.AdcClkRst.set(0x1 << adc)
-        time.sleep(self.serRstTime)
-        self.SystemRegs.AdcClkRst.set(0x0)
-        time.sleep(self.serRstTime)
-        print('Done')
+        # the reset times start once the writes are applied, hence the barriers
+        with self.writeBatch() as batch:
+            print('Reseting ADC deserializer %d ... ' % (adc), end='')
+            batch.set(self.SystemRegs.AdcClkRst, 0x1 << adc)
+            batch.barrier()
+            time.sleep(self.serRstTime)
+            batch.set(self.SystemRegs.AdcClkRst, 0x0)
+            batch.barrier()
+            time.sleep(self.serRstTime)
+            print('Done')
 
-        print('Reseting ADC %d ... ' % (adc), end='')
-        self.Ad9249Config[adc].InternalPdwnMode.set(3)
-        time.sleep(self.adcRstTime)
-        self.Ad9249Config[adc].InternalPdwnMode.set(0)
-        time.sleep(self.adcRstTime)
-        print('Done')
+            print('Reseting ADC %d ... ' % (adc), end='')
+            batch.set(self.Ad9249Config[adc].InternalPdwnMode, 3)
+            batch.barrier()
+            time.sleep(self.adcRstTime)
+            batch.set(self.Ad9249Config[adc].InternalPdwnMode, 0)
+            batch.barrier()
+            time.sleep(self.adcRstTime)
+            print('Done')
 
-        print('Setting ADC in offset binary mode ...', end='')
-        self.Ad9249Config[adc].OutputFormat.set(0)
+            print('Setting ADC in offset binary mode ...', end='')
+            batch.set(self.Ad9249Config[adc].OutputFormat, 0)
         print('Done')
 
     @staticmethod
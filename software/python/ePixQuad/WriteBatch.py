@@ -0,0 +1,63 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue posted register write batch
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+
+class WriteBatch(object):
+    """Issues register writes as posted transactions and waits for them at barriers"""
+
+    def __init__(self, syncVar=None, posted=True):
+
+        # Read back after the posted writes, the register bus is in order so its
+        # response means every write issued before it has been applied
+        self._syncVar = syncVar
+
+        # posted = False falls back to blocking writes, for comparison
+        self._posted = posted
+
+        self._blocks = {}
+        self.writeCount = 0
+        self.barrierCount = 0
+
+    def set(self, var, value):
+        """queues a write of value to var"""
+        self.writeCount += 1
+        if not self._posted:
+            var.set(value)
+            return
+        var.post(value)
+        self._blocks[id(var._block)] = var._block
+
+    def barrier(self):
+        """waits until every queued write has been applied and raises the first error"""
+        self.barrierCount += 1
+        if not self._blocks:
+            return
+        blocks = list(self._blocks.values())
+        self._blocks.clear()
+        for block in blocks:
+            pr.checkTransaction(block)
+        if self._syncVar is not None:
+            self._syncVar.get()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # do not mask the original exception with a flush error
+        if exc_type is None:
+            self.barrier()
+        else:
+            try:
+                self.barrier()
+            except Exception:
+                pass
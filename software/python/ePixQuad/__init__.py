@@ -19,4 +19,12 @@ from ePixQuad.AxiI2cMaster import *
 from ePixQuad.VguardDac import *
 from ePixQuad.EpixVersion import *
 from ePixQuad.SaciConfigCore import *
+from ePixQuad.StreamFifo import *
 from ePixQuad.StreamRepeater import *
+from ePixQuad.SequenceMonitor import *
+from ePixQuad.MonitorHistory import *
+from ePixQuad.MonitorRecorder import *
+from ePixQuad.Emulator import *
+from ePixQuad.WriteBatch import *
+from ePixQuad.PipelineDelayScan import *
+from ePixQuad.ScanEngine import *
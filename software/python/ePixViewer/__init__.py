@@ -7,5 +7,23 @@
 # copied, modified, propagated, or distributed except according to the terms
 # contained in the LICENSE.txt file.
 # -----------------------------------------------------------------------------
-from ePixViewer._ePixViewer import *
 from ePixViewer.imgProcessing import *
+from ePixViewer.pixelHistogram import *
+from ePixViewer.commonMode import *
+from ePixViewer.pixelCalibration import *
+from ePixViewer.frameGenerator import *
+from ePixViewer.datFile import *
+from ePixViewer.eventBuilder import *
+from ePixViewer.integrityCheck import *
+
+
+def __getattr__(name):
+    # the Qt/matplotlib viewer is only imported when one of its names is used,
+    # so the processing modules stay importable on headless nodes
+    if name.startswith('__'):
+        raise AttributeError(name)
+    import ePixViewer._ePixViewer as gui
+    try:
+        return getattr(gui, name)
+    except AttributeError:
+        raise AttributeError("module 'ePixViewer' has no attribute '%s'" % name) from None
@@ -30,6 +30,7 @@ import pyrogue
 import time
 import ePixViewer.imgProcessing as imgPr
 import ePixViewer.Cameras as cameras
+import ePixViewer.datFile as datFile
 import numpy as np
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
@@ -54,7 +55,18 @@ PRINT_VERBOSE = 0
 #   Calls other classes defined in this file to properly read and process
 #   the images in a givel file
 ################################################################################
-app = QApplication([])
+app = None
+
+
+def getApplication():
+    """returns the Qt application, creating it when the first window is built"""
+    global app
+    if app is None:
+        app = QApplication.instance()
+        if app is None:
+            app = QApplication([])
+    return app
+
 
 class Window(QMainWindow, QObject):
     """Class that defines the main window for the viewer."""
@@ -68,6 +80,7 @@ class Window(QMainWindow, QObject):
     processMonitoringFrameTrigger = pyqtSignal()
 
     def __init__(self, cameraType='ePix100a'):
+        getApplication()
         super(Window, self).__init__()
         # window init
         
@@ -125,6 +138,11 @@ class Window(QMainWindow, QObject):
         self.processPseudoScopeFrameTrigger.connect(self.eventReaderScope._processFrame)
         self.processMonitoringFrameTrigger.connect(self.eventReaderMonitoring._processFrame)
 
+        # indexed access to the open .dat file
+        self.filename = ''
+        self.datIndex = None
+        self.datCache = None
+
         # weak way to sync frame reader and display
         self.readFileDelay = 0.1
         self.displayBusy = False
@@ -229,10 +247,13 @@ class Window(QMainWindow, QObject):
     def file_open(self):
         self.eventReader.frameIndex = 1
         self.eventReader.VIEW_DATA_CHANNEL_ID = 1
-        self.setReadDelay(0.1)
         self.filename = QFileDialog.getOpenFileName(
             self, 'Open File', '', 'Rogue Images (*.dat);; GenDAQ Images (*.bin);;Any (*.*)')
+        if isinstance(self.filename, tuple):
+            self.filename = self.filename[0]
         if (os.path.splitext(self.filename)[1] == '.dat'):
+            # frames are read from the index, no need to wait for a replay
+            self.setReadDelay(0)
             self.displayImagDat(self.filename)
         else:
             self.displayImag(self.filename)
@@ -271,20 +292,42 @@ class Window(QMainWindow, QObject):
     # display the previous frame from the current file
 
     def prevFrame(self):
-        self.eventReader.frameIndex = int(self.frameNumberLine.text()) - 1
-        if (self.eventReader.frameIndex < 1):
-            self.eventReader.frameIndex = 1
-        self.frameNumberLine.setText(str(self.eventReader.frameIndex))
-        print('Selected frame ', self.eventReader.frameIndex)
-        self.displayImagDat(self.filename)
+        self.showDatFrame(int(self.frameNumberLine.text()) - 1)
 
     # display the next frame from the current file
 
     def nextFrame(self):
-        self.eventReader.frameIndex = int(self.frameNumberLine.text()) + 1
-        self.frameNumberLine.setText(str(self.eventReader.frameIndex))
-        print('Selected frame ', self.eventReader.frameIndex)
-        self.displayImagDat(self.filename)
+        self.showDatFrame(int(self.frameNumberLine.text()) + 1)
+
+    # display the frame number typed in the frame number box
+
+    def jumpToFrame(self):
+        try:
+            self.showDatFrame(int(self.frameNumberLine.text()))
+        except ValueError:
+            print('Invalid frame number: ', self.frameNumberLine.text())
+
+    def showDatFrame(self, frameIndex):
+        """displays frame frameIndex (1 based) of the open .dat file"""
+        if self.datIndex is None:
+            return
+        # picks up frames appended since the file was opened
+        if frameIndex > len(self.datIndex):
+            self.datIndex.update()
+        frameIndex = max(1, min(frameIndex, len(self.datIndex)))
+        self.eventReader.frameIndex = frameIndex
+        self.frameNumberLine.setText(str(frameIndex))
+        if len(self.datIndex) == 0:
+            print('No image frames in ', self.filename)
+            return
+
+        self.eventReader.frameData[:] = self.datCache.get(frameIndex - 1)
+        self.eventReader.numAcceptedFrames = len(self.datIndex)
+        self.eventReader.readDataDone = True
+        # a seek starts a new image, drop any partially built one
+        self.rawImgFrame = []
+        self.buildImageFrame()
+        self.statusBar().showMessage('Frame {} of {}'.format(frameIndex, len(self.datIndex)))
 
     # checks if the user really wants to exit
 
@@ -316,16 +359,17 @@ class Window(QMainWindow, QObject):
     def displayImagDat(self, filename):
 
         print('File name: ', filename)
-        self.eventReader.readDataDone = False
-        self.eventReader.numAcceptedFrames = 0
-        self.fileReader.open(filename)
-
-        # waits until data is found
-        timeoutCnt = 0
-        while ((self.eventReader.readDataDone == False) and (timeoutCnt < 10)):
-            timeoutCnt += 1
-            print('Loading image...', self.eventReader.frameIndex, 'atempt', timeoutCnt)
-            time.sleep(0.1)
+        if self.datIndex is None or self.datIndex.filename != filename:
+            if self.datCache is not None:
+                self.datCache.close()
+                self.datIndex.close()
+            self.datIndex = datFile.DatFileIndex(filename, channel=self.eventReader.VIEW_DATA_CHANNEL_ID)
+            # files written without writer channels are numbered over every record
+            if len(self.datIndex) == 0:
+                self.datIndex.setChannel(None)
+            self.datCache = datFile.DatFrameCache(self.datIndex)
+            print('Indexed %d frames' % len(self.datIndex))
+        self.showDatFrame(self.eventReader.frameIndex)
 
     # build image frame.
     # If image frame is completed calls displayImageFromReader
@@ -360,7 +404,12 @@ class Window(QMainWindow, QObject):
             # in this condition we have data about two different images
             # since a new image has been sent and the old one is incomplete
             # the next line preserves the new data to be used with the next frame
-            print("Incomplete frame")
+            builder = getattr(self.currentCam, 'eventBuilder', None)
+            if builder is not None:
+                print("Incomplete frame (complete %d, incomplete %d, dropped %d, late %d)" %
+                      (builder.completed, builder.incomplete, builder.dropped, builder.late))
+            else:
+                print("Incomplete frame")
             self.rawImgFrame = newRawData
         if (frameComplete == 1):
             # frees the memory since it has been used alreay enabling a new frame logic to start fresh
@@ -1062,6 +1111,7 @@ class TabbedCtrlCanvas(QTabWidget):
         myParent.frameNumberLine.setMaximumWidth(100)
         myParent.frameNumberLine.setMinimumWidth(50)
         myParent.frameNumberLine.setText(str(1))
+        myParent.frameNumberLine.returnPressed.connect(myParent.jumpToFrame)
 
         # set layout to tab 2
         tab2Frame1 = QFrame()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : common-mode correction for ePixQuad images
+# -----------------------------------------------------------------------------
+# File       : commonMode.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Vectorized common-mode correction of pedestal subtracted images. The image
+# is reshaped into a view following the camera geometry (ASICs, banks served
+# by one ADC channel, rows and columns) and the common-mode level is estimated
+# with numpy reductions over that view. Pixels can be excluded from the
+# estimate with a static pixel mask and with a signal threshold.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import os
+import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CommonModeCorrection():
+    """common-mode correction keyed by the ASIC / bank geometry of the camera"""
+
+    # reduction axes of the (N, asicRow, row, bank, col) view for every mode,
+    # 'asic' uses the (N, asicRow, row, asicCol, col) view instead
+    modes = {
+        'bank': (2, 4),
+        'row': (4,),
+        'column': (2,),
+        'asic': (2, 4),
+    }
+    estimators = ('median', 'mean')
+
+    def __init__(self, mode='bank', estimator='median', numAsicRows=4, numAsicCols=4, asicRows=178,
+                 numBanks=4, bankCols=48, mask=None, threshold=None, numThreads=None):
+        if mode not in self.modes:
+            raise ValueError('Unknown common-mode %r, expected one of %s' % (mode, list(self.modes)))
+        if estimator not in self.estimators:
+            raise ValueError('Unknown estimator %r, expected one of %s' % (estimator, self.estimators))
+
+        self.mode = mode
+        self.estimator = estimator
+        self.numAsicRows = numAsicRows
+        self.numAsicCols = numAsicCols
+        self.asicRows = asicRows
+        self.numBanks = numBanks
+        self.bankCols = bankCols
+        self.imgHeight = numAsicRows * asicRows
+        self.imgWidth = numAsicCols * numBanks * bankCols
+        self.threshold = threshold
+        self.numThreads = numThreads if numThreads is not None else (os.cpu_count() or 1)
+        self.setMask(mask)
+
+    def setMask(self, mask):
+        """sets the static pixel mask, True marks pixels excluded from the estimate"""
+        if mask is None:
+            self.mask = None
+        else:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != (self.imgHeight, self.imgWidth):
+                raise ValueError('Mask shape %s does not match image shape %s' % (mask.shape, (self.imgHeight, self.imgWidth)))
+            self.mask = mask
+
+    def _view(self, images):
+        """reshapes a (N, H, W) stack to the geometry view used by the current mode"""
+        n = images.shape[0]
+        if self.mode == 'asic':
+            return images.reshape(n, self.numAsicRows, self.asicRows, self.numAsicCols, self.numBanks * self.bankCols)
+        return images.reshape(n, self.numAsicRows, self.asicRows, self.numAsicCols * self.numBanks, self.bankCols)
+
+    def estimate(self, images, exclude=None):
+        """returns the common-mode level broadcastable against the geometry view of images,
+           exclude is an optional (N, H, W) mask of further pixels left out of the estimate"""
+        view = self._view(images)
+        axes = self.modes[self.mode]
+
+        excluded = None
+        if self.mask is not None:
+            excluded = self._view(self.mask[np.newaxis])
+        if exclude is not None:
+            exclude = self._view(np.asarray(exclude, dtype=bool))
+            excluded = exclude if excluded is None else (exclude | excluded)
+        if self.threshold is not None:
+            signal = np.abs(view) > self.threshold
+            excluded = signal if excluded is None else (signal | excluded)
+
+        if excluded is None:
+            if self.estimator == 'median':
+                return np.median(view, axis=axes, keepdims=True)
+            return np.mean(view, axis=axes, keepdims=True)
+
+        if self.estimator == 'median':
+            with warnings.catch_warnings():
+                # groups without a single valid pixel are left uncorrected
+                warnings.simplefilter('ignore', RuntimeWarning)
+                level = np.nanmedian(np.where(excluded, np.nan, view), axis=axes, keepdims=True)
+            return np.nan_to_num(level, copy=False)
+
+        valid = ~excluded
+        total = np.sum(view, axis=axes, keepdims=True, where=valid)
+        count = np.sum(valid, axis=axes, keepdims=True)
+        return np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+    def _correctChunk(self, images, out, exclude=None):
+        out[...] = images
+        view = self._view(out)
+        view -= self.estimate(out, exclude).astype(out.dtype, copy=False)
+
+    def apply(self, images, exclude=None):
+        """corrects a float32 (N, H, W) stack in place in the calling thread, for callers running their own workers"""
+        self._correctChunk(images, images, exclude)
+
+    def correct(self, images):
+        """returns a float32 common-mode corrected copy of a (H, W) image or (N, H, W) stack"""
+        images = np.asarray(images)
+        single = images.ndim == 2
+        if single:
+            images = images[np.newaxis]
+        if images.shape[1:] != (self.imgHeight, self.imgWidth):
+            raise ValueError('Image shape %s does not match geometry %s' % (images.shape[1:], (self.imgHeight, self.imgWidth)))
+
+        out = np.empty(images.shape, dtype=np.float32)
+        numChunks = min(self.numThreads, len(images))
+        if numChunks <= 1:
+            self._correctChunk(images, out)
+        else:
+            # numpy releases the GIL inside the reductions, so frames are corrected in parallel
+            bounds = np.linspace(0, len(images), numChunks + 1, dtype=int)
+            with ThreadPoolExecutor(max_workers=numChunks) as pool:
+                jobs = [pool.submit(self._correctChunk, images[a:b], out[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+                for job in jobs:
+                    job.result()
+
+        return out[0] if single else out
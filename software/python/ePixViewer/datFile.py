@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : indexed rogue .dat file access
+# -----------------------------------------------------------------------------
+# File       : datFile.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Walks the record headers of a rogue StreamWriter file once (size word then
+# flags with the channel in bits 31:24 and the error in bits 23:16) and keeps
+# the payload offset of every record, so any frame is read with one seek.
+# DatFrameCache keeps recently used payloads and prefetches the neighbours of
+# the last requested frame from a background thread.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import collections
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+
+class DatFileIndex():
+    """record offsets, sizes and channels of a rogue .dat file"""
+
+    def __init__(self, filename, channel=None):
+        self.filename = filename
+        self.channel = channel
+        self._file = open(filename, 'rb')
+        self._map = None
+        self._scanned = 0
+        self._offsets = []
+        self._sizes = []
+        self._channels = []
+        self._errors = []
+        self._build()
+        self.update()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def update(self):
+        """indexes the records appended since the last call, returns the number of new records"""
+        fileSize = os.fstat(self._file.fileno()).st_size
+        if fileSize == 0:
+            return 0
+        # the previous map is left to the garbage collector, prefetch threads may still read it
+        if self._map is None or len(self._map) < fileSize:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        pos = self._scanned
+        count = len(self._offsets)
+        while pos + 8 <= fileSize:
+            size, flags = struct.unpack_from('<II', self._map, pos)
+            # an incomplete last record is picked up by the next update
+            if size < 4 or pos + 4 + size > fileSize:
+                break
+            self._offsets.append(pos + 8)
+            self._sizes.append(size - 4)
+            self._channels.append(flags >> 24)
+            self._errors.append((flags >> 16) & 0xFF)
+            pos += 4 + size
+        self._scanned = pos
+        self._build()
+        return len(self._offsets) - count
+
+    def _build(self):
+        self.offsets = np.array(self._offsets, dtype=np.int64)
+        self.sizes = np.array(self._sizes, dtype=np.int64)
+        self.channels = np.array(self._channels, dtype=np.uint8)
+        self.errors = np.array(self._errors, dtype=np.uint8)
+        self._select()
+
+    def _select(self):
+        if self.channel is None:
+            self.records = np.arange(len(self.offsets))
+        else:
+            self.records = np.flatnonzero(self.channels == self.channel)
+
+    def setChannel(self, channel):
+        """restricts the frame numbering to one writer channel, None for every record"""
+        self.channel = channel
+        self._select()
+
+    def __len__(self):
+        return len(self.records)
+
+    def headers(self, words=3, chunk=1 << 20):
+        """first words dwords of every selected frame, (len, words), zero past the end of short frames"""
+        records = self.records
+        out = np.zeros((len(records), words), dtype=np.uint32)
+        if len(records) == 0:
+            return out
+        data = np.frombuffer(self._map, dtype=np.uint8)
+        aligned = not np.any(self.offsets[records] & 0x3)
+        if aligned:
+            data32 = np.frombuffer(self._map, dtype=np.uint32, count=len(self._map) // 4)
+
+        # chunks bound the size of the gather indices on large files
+        for first in range(0, len(records), chunk):
+            rec = records[first:first + chunk]
+            offsets = self.offsets[rec]
+            for k in range(words):
+                valid = self.sizes[rec] >= 4 * (k + 1)
+                pos = offsets[valid] + 4 * k
+                if aligned:
+                    value = data32[pos >> 2]
+                else:
+                    value = (data[pos].astype(np.uint32) | (data[pos + 1].astype(np.uint32) << 8) |
+                             (data[pos + 2].astype(np.uint32) << 16) | (data[pos + 3].astype(np.uint32) << 24))
+                out[first:first + len(rec), k][valid] = value
+        return out
+
+    def read(self, index):
+        """payload of frame index of the selected channel"""
+        record = self.records[index]
+        offset = self.offsets[record]
+        return bytearray(self._map[offset:offset + self.sizes[record]])
+
+
+class DatFrameCache():
+    """LRU cache of DatFileIndex payloads with background prefetch of the neighbouring frames"""
+
+    def __init__(self, index, capacity=32, prefetch=4):
+        self.index = index
+        self.capacity = capacity
+        self.prefetch = prefetch
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._wanted = collections.deque()
+        self._wake = threading.Condition(self._lock)
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name='DatFramePrefetch', daemon=True)
+        self._worker.start()
+
+    def close(self):
+        with self._wake:
+            self._running = False
+            self._wake.notify()
+        self._worker.join()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._wanted.clear()
+
+    def get(self, i):
+        """payload of frame i, then prefetches the frames around it"""
+        with self._lock:
+            data = self._cache.get(i)
+            if data is not None:
+                self._cache.move_to_end(i)
+                self.hits += 1
+        if data is None:
+            self.misses += 1
+            data = self.index.read(i)
+            self._store(i, data)
+
+        # the next frames first, stepping forward is the common case
+        with self._wake:
+            self._wanted.clear()
+            for k in range(1, self.prefetch + 1):
+                for j in (i + k, i - k):
+                    if 0 <= j < len(self.index) and j not in self._cache:
+                        self._wanted.append(j)
+            self._wake.notify()
+        return data
+
+    def _store(self, i, data):
+        with self._lock:
+            self._cache[i] = data
+            self._cache.move_to_end(i)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while self._running and not self._wanted:
+                    self._wake.wait()
+                if not self._running:
+                    return
+                i = self._wanted.popleft()
+                if i in self._cache:
+                    continue
+            self._store(i, self.index.read(i))
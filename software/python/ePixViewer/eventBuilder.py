@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : multi-packet event builder
+# -----------------------------------------------------------------------------
+# File       : eventBuilder.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Reassembles images sent as one packet per ASIC (and per ToA/ToT half) keyed
+# by the acquisition number of header dword 1. Several acquisitions can be in
+# flight at once, so reordered packets do not break an image. An acquisition
+# is emitted once all of its packets arrived, or as incomplete after a timeout
+# or when the slot pool is full. Events use the layout the Camera descramblers
+# expect: one uint32 row per packet, the valid flag in word 0 then the packet.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class EventBuilder():
+    """builds events of numPackets packets of packetWords dwords keyed by acquisition number"""
+
+    def __init__(self, numPackets, packetWords, packetIndex, inFlight=4, timeout=1.0, history=256):
+        self.numPackets = numPackets
+        self.packetWords = packetWords
+
+        # packetIndex(header) maps the packet header dwords to its row, None drops the packet
+        self.packetIndex = packetIndex
+
+        # seconds an incomplete acquisition waits for its missing packets
+        self.timeout = timeout
+
+        # acquisitions assembled at the same time
+        self.inFlight = inFlight
+
+        # one extra slot holds the last emitted event until the next one is emitted
+        self._pool = np.zeros((inFlight + 1, numPackets, packetWords + 1), dtype=np.uint32)
+        self._free = collections.deque(range(inFlight + 1))
+        self._emitted = None
+
+        # acqNum -> [slot, number of packets received, time of the first packet]
+        self._pending = collections.OrderedDict()
+
+        # recently emitted acquisitions, their packets are counted as late
+        self._retired = collections.OrderedDict()
+        self._history = history
+
+        self._lock = threading.Lock()
+        self.resetCounters()
+
+    def resetCounters(self):
+        self.completed = 0
+        self.incomplete = 0
+        self.dropped = 0
+        self.late = 0
+
+    def reset(self):
+        """discards the pending acquisitions"""
+        with self._lock:
+            for slot, count, start in self._pending.values():
+                self._free.append(slot)
+            self._pending.clear()
+            self._retired.clear()
+
+    def push(self, rawData, now=None):
+        """adds one packet, returns the list of (acqNum, complete, event) emitted by it"""
+        if now is None:
+            now = time.monotonic()
+        events = []
+
+        with self._lock:
+            self._expire(now, events)
+
+            # a truncated packet is dropped before it is viewed as dwords
+            if memoryview(rawData).nbytes != 4 * self.packetWords:
+                self.dropped += 1
+                return events
+            data = np.frombuffer(rawData, dtype=np.uint32)
+            acqNum = int(data[1])
+            row = self.packetIndex(data)
+            if row is None:
+                self.dropped += 1
+                return events
+            if acqNum in self._retired:
+                self.late += 1
+                return events
+
+            entry = self._pending.get(acqNum)
+            if entry is None:
+                # the oldest acquisition gives up its slot when all are in use
+                if len(self._pending) >= self.inFlight:
+                    self._emit(next(iter(self._pending)), events)
+                slot = self._free.popleft()
+                self._pool[slot, :, 0] = 0
+                entry = self._pending[acqNum] = [slot, 0, now]
+
+            event = self._pool[entry[0]]
+            if event[row, 0]:
+                self.dropped += 1
+                return events
+            event[row, 0] = 1
+            event[row, 1:] = data
+            entry[1] += 1
+            if entry[1] == self.numPackets:
+                self._emit(acqNum, events)
+        return events
+
+    def expire(self, now=None):
+        """emits the acquisitions older than timeout as incomplete"""
+        events = []
+        with self._lock:
+            self._expire(time.monotonic() if now is None else now, events)
+        return events
+
+    def flush(self):
+        """emits every pending acquisition"""
+        events = []
+        with self._lock:
+            while self._pending:
+                self._emit(next(iter(self._pending)), events)
+        return events
+
+    def _expire(self, now, events):
+        while self._pending:
+            acqNum, (slot, count, start) = next(iter(self._pending.items()))
+            if now - start < self.timeout:
+                break
+            self._emit(acqNum, events)
+
+    def _emit(self, acqNum, events):
+        slot, count, start = self._pending.pop(acqNum)
+        complete = count == self.numPackets
+        if complete:
+            self.completed += 1
+        else:
+            self.incomplete += 1
+
+        self._retired[acqNum] = None
+        if len(self._retired) > self._history:
+            self._retired.popitem(last=False)
+
+        if self._emitted is not None:
+            # an event emitted earlier by the same call keeps its data
+            if events:
+                acq, done, event = events[-1]
+                events[-1] = (acq, done, event.copy())
+            self._free.append(self._emitted)
+        self._emitted = slot
+        events.append((acqNum, complete, self._pool[slot]))
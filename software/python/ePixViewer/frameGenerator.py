@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : synthetic ePixQuad frame generator
+# -----------------------------------------------------------------------------
+# File       : frameGenerator.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Builds byte exact ePixQuad frames (32 byte header, scrambled super-rows and
+# the 76 byte telemetry footer) from (712, 768) images with a programmable
+# pedestal, noise, gain bits and pulser pattern. Frames are built in batches
+# with numpy, written to rogue .dat files or sent through a rogue stream
+# master when rogue is available.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+import ePixViewer.Cameras as cameras
+
+try:
+    import rogue.interfaces.stream as ris
+except ImportError:
+    ris = None
+
+
+class QuadFrameGenerator():
+    """generates scrambled ePixQuad data frames"""
+
+    headerSize = 32
+    footerSize = 76
+    adcMask = 0x3FFF
+    gainBit = 0x4000
+
+    # number of precomputed noise images cycled through by generate()
+    numNoiseImages = 16
+
+    def __init__(self, height=712, width=768, pedestal=1500, noise=0.0, gain=None,
+                 pulser=None, pulserAmplitude=1000, telemetry=None, seed=None):
+        self.height = height
+        self.width = width
+        self.rowOrder = cameras.ePixQuadRowOrder(height)
+        self.frameSize = self.headerSize + height * width * 2 + self.footerSize
+        self._rng = np.random.default_rng(seed)
+        self._cache = None
+
+        self.setPedestal(pedestal)
+        self.setNoise(noise)
+        self.setGain(gain)
+        self.setPulser(pulser, pulserAmplitude)
+        self.setTelemetry(telemetry)
+
+    def setPedestal(self, pedestal):
+        """scalar or (H, W) pedestal in ADU"""
+        self.pedestal = np.broadcast_to(np.asarray(pedestal, dtype=np.float32), (self.height, self.width))
+        self._cache = None
+
+    def setNoise(self, noise):
+        """scalar or (H, W) gaussian noise sigma in ADU"""
+        noise = np.broadcast_to(np.asarray(noise, dtype=np.float32), (self.height, self.width))
+        if np.any(noise > 0):
+            self._noise = self._rng.standard_normal((self.numNoiseImages, self.height, self.width), dtype=np.float32) * noise
+        else:
+            self._noise = None
+        self._cache = None
+
+    def setGain(self, gain):
+        """None, a bool or a (H, W) boolean map of pixels with the gain bit set"""
+        if gain is None:
+            self.gain = None
+        else:
+            self.gain = np.broadcast_to(np.asarray(gain, dtype=bool), (self.height, self.width))
+        self._cache = None
+
+    def setPulser(self, pulser, amplitude=1000):
+        """None or a (H, W) boolean map of pulsed pixels, see pulserPattern()"""
+        if pulser is None:
+            self.pulser = None
+        else:
+            self.pulser = np.asarray(pulser, dtype=bool)
+        self.pulserAmplitude = amplitude
+        self._cache = None
+
+    def setTelemetry(self, telemetry):
+        """38 footer words: SHT, NCT, 8 AD7949 and 26 SensorRegRaw values"""
+        footer = np.zeros(self.footerSize // 2, dtype=np.uint16)
+        if telemetry is not None:
+            telemetry = np.asarray(telemetry, dtype=np.uint16)
+            footer[:len(telemetry)] = telemetry
+        self.footer = footer
+        self._cache = None
+
+    def pulserPattern(self, rows=range(20, 24), cols=range(5, 8), asicRows=178, bankCols=48):
+        """pulsed region of SetAsicMatrixTest, the same rows and columns in every bank of every ASIC"""
+        mask = np.zeros((self.height // asicRows, asicRows, self.width // bankCols, bankCols), dtype=bool)
+        mask[:, list(rows)[0]:list(rows)[-1] + 1, :, list(cols)[0]:list(cols)[-1] + 1] = True
+        return mask.reshape(self.height, self.width)
+
+    def images(self, numFrames, start=0):
+        """(N, H, W) uint16 pixel words of frames start to start + numFrames"""
+        img = np.empty((numFrames, self.height, self.width), dtype=np.float32)
+        img[...] = self.pedestal
+        if self._noise is not None:
+            for i in range(numFrames):
+                img[i] += self._noise[(start + i) % self.numNoiseImages]
+        if self.pulser is not None:
+            img[:, self.pulser] += self.pulserAmplitude
+
+        out = np.clip(np.rint(img), 0, self.adcMask).astype(np.uint16)
+        if self.gain is not None:
+            out[:, self.gain] |= self.gainBit
+        return out
+
+    def scramble(self, images):
+        """reorders (N, H, W) descrambled images to the super-row order sent by the camera"""
+        images = np.asarray(images, dtype=np.uint16)
+        raw = np.empty_like(images)
+        raw[:, self.rowOrder] = images
+        return raw
+
+    def frames(self, images, acqNum=0, seqNum=None, vc=0):
+        """(N, frameSize) uint8 frames built from (N, H, W) descrambled images"""
+        images = np.asarray(images)
+        if images.ndim == 2:
+            images = images[np.newaxis]
+        n = len(images)
+        if seqNum is None:
+            seqNum = acqNum
+
+        out = np.zeros((n, self.frameSize), dtype=np.uint8)
+
+        header = out[:, :self.headerSize].view(np.uint32)
+        header[:, 0] = vc & 0xF
+        header[:, 1] = acqNum + np.arange(n, dtype=np.uint32)
+        header[:, 2] = seqNum + np.arange(n, dtype=np.uint32)
+
+        pixels = out[:, self.headerSize:self.frameSize - self.footerSize].view(np.uint16)
+        pixels.reshape(n, self.height, self.width)[:, self.rowOrder] = images
+
+        out[:, self.frameSize - self.footerSize:].view(np.uint16)[:] = self.footer
+        return out
+
+    def generate(self, numFrames, acqNum=0):
+        """(N, frameSize) uint8 frames from the configured pedestal, noise, gain and pulser"""
+        # the noise realisations are scrambled once, generating a frame is then a copy and a header update
+        if self._cache is None:
+            numCached = self.numNoiseImages if self._noise is not None else 1
+            self._cache = self.frames(self.images(numCached))
+
+        out = self._cache[(acqNum + np.arange(numFrames)) % len(self._cache)]
+        header = out[:, :self.headerSize].view(np.uint32)
+        header[:, 1] = acqNum + np.arange(numFrames, dtype=np.uint32)
+        header[:, 2] = header[:, 1]
+        return out
+
+    def writeDat(self, filename, numFrames, channel=1, batchSize=64, append=False):
+        """writes numFrames generated frames as rogue StreamWriter records"""
+        recordSize = 8 + self.frameSize
+        with open(filename, 'ab' if append else 'wb') as f:
+            for start in range(0, numFrames, batchSize):
+                n = min(batchSize, numFrames - start)
+                records = np.empty((n, recordSize), dtype=np.uint8)
+                # record header: size including the flags word, then channel in bits 31:24
+                records[:, :8].view(np.uint32)[:] = (self.frameSize + 4, (channel & 0xFF) << 24)
+                records[:, 8:] = self.generate(n, acqNum=start)
+                records.tofile(f)
+
+
+if ris is not None:
+
+    class QuadFrameSource(ris.Master):
+        """rogue stream master sending generated ePixQuad frames"""
+
+        def __init__(self, generator):
+            super().__init__()
+            self.generator = generator
+            self.acqNum = 0
+
+        def sendFrames(self, numFrames, batchSize=64):
+            for start in range(0, numFrames, batchSize):
+                n = min(batchSize, numFrames - start)
+                for data in self.generator.generate(n, acqNum=self.acqNum):
+                    frame = self._reqFrame(len(data), True)
+                    frame.write(data, 0)
+                    self._sendFrame(frame)
+                    self.acqNum += 1
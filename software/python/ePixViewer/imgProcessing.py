@@ -24,21 +24,9 @@
 
 import sys
 import os
-import rogue.utilities
-import rogue.utilities.fileio
-import rogue.interfaces.stream
-import pyrogue
 import time
 import numpy as np
 
-try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore import *
-    from PyQt5.QtGui import *
-except ImportError:
-    from PyQt4.QtCore import *
-    from PyQt4.QtGui import *
-
 PRINT_VERBOSE = 0
 
 ################################################################################
@@ -66,6 +54,8 @@ class ImageProcessing():
     _imgDarkSet = np.array([], dtype='uint16')
     imgDark_isSet = False
     imgDark_isRequested = False
+    # optional CommonModeCorrection applied after the dark subtraction
+    commonMode = None
 
     def __init__(self, parent):
         # pointer to the parent class
@@ -103,7 +93,10 @@ class ImageProcessing():
         self.imgDark_isSet = False
 
     def getDarkSubtractedImg(self, rawImg):
-        return rawImg - self.imgDark
+        img = rawImg - self.imgDark
+        if self.commonMode is not None:
+            img = self.commonMode.correct(img)
+        return img
 
     def reScaleImgTo8bit(self, rawImage, scaleMax=20000, scaleMin=-200):
         # init
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : whole file header and sequence integrity check
+# -----------------------------------------------------------------------------
+# File       : integrityCheck.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Checks every frame of a rogue .dat file at once. The frame headers are
+# gathered from the memory mapped DatFileIndex into arrays (dword 0 VC,
+# dword 1 acquisition number, dword 2 sequence counter) and the frame size,
+# writer error, VC mix, sequence gap/duplicate and acquisition number order
+# checks are numpy operations on these arrays.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+import ePixViewer.datFile as datFile
+
+# payload bytes of one frame of the single packet cameras
+FRAME_SIZES = {
+    'ePix10ka': 274988,
+    'ePixQuad': 32 + 712 * 768 * 2 + 76,
+    'Cpix2': 4624,
+}
+
+
+class IntegrityReport():
+    """results of checkDatFile, frame numbers count the checked frames of the file"""
+
+    def __init__(self, filename, frames, fileFrames):
+        self.filename = filename
+        self.frames = frames
+        self.fileFrames = fileFrames
+        self.frameSize = None
+        self.sizeErrors = np.zeros(0, dtype=np.int64)
+        self.writerErrors = np.zeros(0, dtype=np.int64)
+        self.vcCounts = {}
+        self.channelCounts = {}
+        self.seqGaps = np.zeros(0, dtype=np.int64)
+        self.seqMissing = 0
+        self.seqDuplicates = np.zeros(0, dtype=np.int64)
+        self.seqBackwards = np.zeros(0, dtype=np.int64)
+        self.acqBackwards = np.zeros(0, dtype=np.int64)
+
+    @property
+    def ok(self):
+        return not (len(self.sizeErrors) or len(self.writerErrors) or len(self.seqGaps) or
+                    len(self.seqDuplicates) or len(self.seqBackwards) or len(self.acqBackwards))
+
+    def summary(self, maxList=10):
+        def frames(values):
+            text = ' '.join(str(v) for v in values[:maxList])
+            return text + (' ...' if len(values) > maxList else '')
+
+        lines = ['%s: %d frames checked of %d records' % (self.filename, self.frames, self.fileFrames)]
+        lines.append('  channels %s, VCs %s' % (self.channelCounts, self.vcCounts))
+        if self.frameSize is not None:
+            lines.append('  size != %d bytes: %d %s' % (self.frameSize, len(self.sizeErrors), frames(self.sizeErrors)))
+        lines.append('  writer errors: %d %s' % (len(self.writerErrors), frames(self.writerErrors)))
+        lines.append('  sequence gaps: %d (%d frames missing) %s' % (len(self.seqGaps), self.seqMissing, frames(self.seqGaps)))
+        lines.append('  sequence duplicates: %d %s' % (len(self.seqDuplicates), frames(self.seqDuplicates)))
+        lines.append('  sequence backwards: %d %s' % (len(self.seqBackwards), frames(self.seqBackwards)))
+        lines.append('  acqNum backwards: %d %s' % (len(self.acqBackwards), frames(self.acqBackwards)))
+        lines.append('  %s' % ('OK' if self.ok else 'FAILED'))
+        return '\n'.join(lines)
+
+
+def checkDatFile(filename, frameSize=None, channel=None, vc=0):
+    """checks the frames of writer channel (None for every record), the sequence
+       and acquisition number checks use the frames of header VC vc (None for all)"""
+    index = datFile.DatFileIndex(filename, channel)
+    try:
+        return checkIndex(index, frameSize, vc)
+    finally:
+        index.close()
+
+
+def checkIndex(index, frameSize=None, vc=0):
+    """checkDatFile on an open DatFileIndex"""
+    records = index.records
+    report = IntegrityReport(index.filename, len(records), len(index.offsets))
+    if len(records) == 0:
+        return report
+
+    sizes = index.sizes[records]
+    header = index.headers(3)
+    frameVc = header[:, 0] & 0xF
+
+    report.frameSize = frameSize
+    if frameSize is not None:
+        report.sizeErrors = np.flatnonzero(sizes != frameSize)
+    report.writerErrors = np.flatnonzero(index.errors[records] != 0)
+
+    values, counts = np.unique(frameVc[sizes >= 4], return_counts=True)
+    report.vcCounts = {int(v): int(c) for v, c in zip(values, counts)}
+    values, counts = np.unique(index.channels[records], return_counts=True)
+    report.channelCounts = {int(v): int(c) for v, c in zip(values, counts)}
+
+    # frames shorter than the header do not take part in the counter checks
+    sel = sizes >= 12
+    if vc is not None:
+        sel &= frameVc == vc
+    frameNum = np.flatnonzero(sel)
+    if len(frameNum) < 2:
+        return report
+
+    # counter steps modulo 2^32 so a wrap is a step of one, backwards steps are large
+    seqStep = np.diff(header[sel, 2]).astype(np.int64) & 0xFFFFFFFF
+    seqStep[seqStep >= 1 << 31] -= 1 << 32
+    acqStep = np.diff(header[sel, 1]).astype(np.int64) & 0xFFFFFFFF
+    acqStep[acqStep >= 1 << 31] -= 1 << 32
+
+    # frame numbers of the frame following the step
+    gaps = seqStep > 1
+    report.seqGaps = frameNum[1:][gaps]
+    report.seqMissing = int(np.sum(seqStep[gaps] - 1))
+    report.seqDuplicates = frameNum[1:][seqStep == 0]
+    report.seqBackwards = frameNum[1:][seqStep < 0]
+    report.acqBackwards = frameNum[1:][acqStep < 0]
+    return report
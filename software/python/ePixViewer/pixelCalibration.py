@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : gain aware pixel calibration for epix10ka based cameras
+# -----------------------------------------------------------------------------
+# File       : pixelCalibration.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# The epix10ka pixel word carries the ADC value in the low 14 bits and the
+# gain bit above it. The calibration splits the descrambled raw words into
+# ADC value and gain bit, subtracts the per-pixel pedestal of the selected
+# gain, optionally applies a common-mode correction and scales the result with
+# the per-pixel gain constant of the selected gain (e.g. keV/ADU).
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PixelCalibration():
+    """per-pixel, per-gain pedestal and gain calibration of epix10ka raw images"""
+
+    adcBits = 14
+    adcMask = (1 << adcBits) - 1
+    numGains = 2
+
+    def __init__(self, pedestal, gain=None, commonMode=None, numThreads=None):
+        # constants are stored as contiguous float32 (gain, row, col) arrays
+        self.pedestal = np.ascontiguousarray(pedestal, dtype=np.float32)
+        if self.pedestal.ndim != 3 or self.pedestal.shape[0] != self.numGains:
+            raise ValueError('Pedestal must have shape (%d, H, W), got %s' % (self.numGains, self.pedestal.shape))
+        self.shape = self.pedestal.shape[1:]
+
+        if gain is None:
+            self.gain = None
+        else:
+            self.gain = np.ascontiguousarray(np.broadcast_to(gain, self.pedestal.shape), dtype=np.float32)
+
+        self.commonMode = commonMode
+        self.numThreads = numThreads if numThreads is not None else (os.cpu_count() or 1)
+
+    @classmethod
+    def load(cls, filename, **kwargs):
+        """loads the constants from a .npz file holding 'pedestal' and optionally 'gain'"""
+        with np.load(filename) as data:
+            gain = data['gain'] if 'gain' in data.files else None
+            return cls(data['pedestal'], gain, **kwargs)
+
+    def save(self, filename):
+        if self.gain is None:
+            np.savez(filename, pedestal=self.pedestal)
+        else:
+            np.savez(filename, pedestal=self.pedestal, gain=self.gain)
+
+    @classmethod
+    def split(cls, raw):
+        """splits raw pixel words into the ADC value and the gain bit"""
+        raw = np.asarray(raw)
+        return raw & cls.adcMask, (raw >> cls.adcBits) & 0x1
+
+    def _calibrateChunk(self, raw, out):
+        adc, gainBit = self.split(raw)
+        switched = gainBit.astype(bool)
+
+        np.subtract(adc, self.pedestal[0], out=out, dtype=np.float32)
+        np.subtract(adc, self.pedestal[1], out=out, where=switched)
+
+        # the chunk already runs on a worker, gain switched pixels carry signal and stay out of the estimate
+        if self.commonMode is not None:
+            self.commonMode.apply(out, exclude=switched)
+
+        if self.gain is not None:
+            out *= np.where(switched, self.gain[1], self.gain[0])
+
+    def calibrate(self, raw):
+        """returns the float32 calibrated (H, W) image or (N, H, W) stack of raw images"""
+        raw = np.asarray(raw)
+        single = raw.ndim == 2
+        if single:
+            raw = raw[np.newaxis]
+        if raw.shape[1:] != self.shape:
+            raise ValueError('Image shape %s does not match calibration shape %s' % (raw.shape[1:], self.shape))
+
+        out = np.empty(raw.shape, dtype=np.float32)
+        numChunks = min(self.numThreads, len(raw))
+        if numChunks <= 1:
+            self._calibrateChunk(raw, out)
+        else:
+            # the numpy kernels release the GIL, so chunks run on all cores
+            bounds = np.linspace(0, len(raw), numChunks + 1, dtype=int)
+            with ThreadPoolExecutor(max_workers=numChunks) as pool:
+                jobs = [pool.submit(self._calibrateChunk, raw[a:b], out[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+                for job in jobs:
+                    job.result()
+
+        return out[0] if single else out
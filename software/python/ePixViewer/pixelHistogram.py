@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Title      : per-pixel histogram accumulator
+# -----------------------------------------------------------------------------
+# File       : pixelHistogram.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Accumulates per-pixel ADC histograms in a (H, W, nbins) counts cube. Each
+# pixel owns a window of nbins bins placed around its pedestal so dark and
+# pulser runs can be histogrammed on the fly instead of storing every frame.
+# Histograms filled by different worker processes can be merged and the
+# accumulator can be saved to and restored from a numpy .npz file.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+
+class PixelHistogram():
+    """per-pixel histogram cube with a bin window around each pixel pedestal"""
+
+    def __init__(self, shape=(712, 768), nbins=256, binWidth=1, pedestal=None, dtype='uint16'):
+        if nbins <= 0 or binWidth <= 0:
+            raise ValueError('nbins and binWidth must be positive')
+        if np.dtype(dtype) not in (np.dtype('uint16'), np.dtype('uint32')):
+            raise ValueError('dtype must be uint16 or uint32')
+
+        self.shape = tuple(shape)
+        self.nbins = int(nbins)
+        self.binWidth = int(binWidth)
+        self.counts = np.zeros(self.shape + (self.nbins,), dtype=dtype)
+        self.underflow = np.zeros(self.shape, dtype='uint32')
+        self.overflow = np.zeros(self.shape, dtype='uint32')
+        self.numFrames = 0
+
+        # set by the first fill, float frames use other bin centres than integer ADC values
+        self.floatInput = False
+
+        # flat index of the first bin of every pixel, used by the scatter-add
+        self._pixelBase = (np.arange(self.shape[0] * self.shape[1], dtype=np.int64) * self.nbins).reshape(self.shape)
+
+        self.lowEdge = None
+        if pedestal is not None:
+            self.setPedestal(pedestal)
+
+    def setPedestal(self, pedestal):
+        """centres the bin window of every pixel on the given pedestal"""
+        if self.numFrames != 0:
+            raise RuntimeError('Pedestal can only be set on an empty histogram')
+        pedestal = np.broadcast_to(np.asarray(pedestal), self.shape)
+        half = (self.nbins * self.binWidth) // 2
+        self.lowEdge = np.rint(pedestal).astype(np.int32) - half
+
+    def fill(self, frames):
+        """adds one (H, W) frame or a (N, H, W) stack of frames to the histograms"""
+        frames = np.asarray(frames)
+        if frames.ndim == 2:
+            frames = frames[np.newaxis]
+        if frames.shape[1:] != self.shape:
+            raise ValueError('Frame shape %s does not match histogram shape %s' % (frames.shape[1:], self.shape))
+
+        # without an explicit pedestal the window is centred on the first frames
+        if self.lowEdge is None:
+            self.setPedestal(np.median(frames, axis=0))
+
+        self._reserve(len(frames))
+        if self.numFrames == 0:
+            self.floatInput = frames.dtype.kind == 'f'
+
+        flatCounts = self.counts.reshape(-1)
+        for frame in frames:
+            if frame.dtype.kind == 'f':
+                bins = np.floor((frame - self.lowEdge) / self.binWidth).astype(np.int64)
+            else:
+                bins = (frame.astype(np.int64) - self.lowEdge) // self.binWidth
+
+            under = bins < 0
+            over = bins >= self.nbins
+            self.underflow += under
+            self.overflow += over
+
+            # every pixel appears once per frame, so plain fancy indexing is a valid scatter-add
+            inRange = ~(under | over)
+            flatCounts[self._pixelBase[inRange] + bins[inRange]] += 1
+
+        self.numFrames += len(frames)
+
+    def _reserve(self, numFrames):
+        """promotes uint16 counts to uint32 before they could overflow"""
+        if self.counts.dtype == np.uint16 and self.numFrames + numFrames > np.iinfo(np.uint16).max:
+            self.counts = self.counts.astype(np.uint32)
+
+    def merge(self, other):
+        """adds the counts of a histogram filled with the same binning"""
+        if other.lowEdge is None:
+            return self
+        if (other.shape != self.shape or other.nbins != self.nbins or other.binWidth != self.binWidth
+                or (self.lowEdge is not None and not np.array_equal(other.lowEdge, self.lowEdge))
+                or (self.numFrames and other.numFrames and self.floatInput != other.floatInput)):
+            raise ValueError('Cannot merge histograms with different binning')
+        if self.lowEdge is None:
+            self.lowEdge = other.lowEdge.copy()
+        if self.numFrames == 0:
+            self.floatInput = other.floatInput
+
+        self._reserve(other.numFrames)
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.numFrames += other.numFrames
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def entries(self):
+        """number of in-window entries of each pixel"""
+        return self.counts.sum(axis=2, dtype=np.uint64)
+
+    def _centerOffset(self):
+        # integer frames fill bin k with lowEdge + k * binWidth ... + binWidth - 1,
+        # float frames with the interval [lowEdge + k * binWidth, lowEdge + (k + 1) * binWidth)
+        return self.binWidth / 2 if self.floatInput else (self.binWidth - 1) / 2
+
+    def binCenters(self, row, col):
+        """ADC value at the centre of each bin of one pixel"""
+        return self.lowEdge[row, col] + np.arange(self.nbins) * self.binWidth + self._centerOffset()
+
+    def mean(self):
+        """per-pixel mean computed from the in-window counts"""
+        k = np.arange(self.nbins, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            m = self.counts.dot(k) / self.entries()
+        return self.lowEdge + m * self.binWidth + self._centerOffset()
+
+    def rms(self):
+        """per-pixel rms computed from the in-window counts"""
+        k = np.arange(self.nbins, dtype=np.float64)
+        n = self.entries()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            m1 = self.counts.dot(k) / n
+            m2 = self.counts.dot(k * k) / n
+        return np.sqrt(np.maximum(m2 - m1 * m1, 0)) * self.binWidth
+
+    def save(self, filename):
+        # an empty lowEdge stands for a histogram without pedestal yet
+        lowEdge = np.zeros(0, dtype=np.int32) if self.lowEdge is None else self.lowEdge
+        np.savez_compressed(filename, counts=self.counts, lowEdge=lowEdge, binWidth=self.binWidth,
+                            underflow=self.underflow, overflow=self.overflow, numFrames=self.numFrames,
+                            floatInput=self.floatInput)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            counts = data['counts']
+            hist = cls(shape=counts.shape[:2], nbins=counts.shape[2], binWidth=int(data['binWidth']), dtype=counts.dtype)
+            hist.counts = counts
+            hist.lowEdge = data['lowEdge'] if data['lowEdge'].size else None
+            hist.underflow = data['underflow']
+            hist.overflow = data['overflow']
+            hist.numFrames = int(data['numFrames'])
+            hist.floatInput = bool(data['floatInput']) if 'floatInput' in data.files else False
+        return hist
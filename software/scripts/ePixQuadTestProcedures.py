@@ -278,6 +278,14 @@ parser.add_argument(
     help="Number of frames per threshold",
 )
 
+parser.add_argument(
+    "--framesPerDark",
+    type=int,
+    required=False,
+    default=2400,
+    help="Number of dark frames per gain mode",
+)
+
 parser.add_argument(
     "--acqWidth",
     type=int,
@@ -390,180 +398,59 @@ print('Set integration time to %d' % (args.acqWidth))
 base.AcqCore.AsicAcqWidth.set(args.acqWidth)
 base.AcqCore.AsicR0ToAsicAcq.set(args.acqWidth)
 
-for trbit in range(2):
+for asicNo in range(16):
+    base.Epix10kaSaci[asicNo].enable.set(True)
 
-    for asicNo in range(16):
-        print('Enable ASICs test')
-        base.Epix10kaSaci[asicNo].test.set(True)
-        print('Enable ASICs atest')
-        base.Epix10kaSaci[asicNo].atest.set(True)
-        if trbit == 1:
-            print('Setting trbit to 1 (high to low gain)')
-            base.Epix10kaSaci[asicNo].trbit.set(True)
-        else:
-            print('Setting trbit to 0 (medium to low gain)')
-            base.Epix10kaSaci[asicNo].trbit.set(False)
+# calibration steps: 2x2 pulser grids then darks in 5 gain modes, for both trbit values
+steps = []
+for trbit in range(2):
 
     for x in range(2):
         for y in range(2):
-
-            for asicNo in range(16):
-                print('Clearing ASICs matrix (auto-range)')
-                base.Epix10kaSaci[asicNo].ClearMatrix()
-
-                print('Setting ASICs matrix to %d%d pattern' % (x, y))
-                setAsicMatrixGrid22(x, y, 1, base.Epix10kaSaci[asicNo])
-
-                print('Reset pulser')
-                base.Epix10kaSaci[asicNo].PulserR.set(True)
-                base.Epix10kaSaci[asicNo].PulserR.set(False)
-
-            print('Open data file')
-            base.dataWriter.dataFile.set(
-                args.dir +
-                '/calib_acq_width' +
-                '{:06d}'.format(
-                    args.acqWidth) +
-                '_trbit' +
-                '{:1d}'.format(trbit) +
-                '_22' +
-                '{:1d}'.format(x) +
-                '{:1d}'.format(y) +
-                '.dat')
-            base.dataWriter.open.set(True)
-
-            # eanble automatic readout
-            base.SystemRegs.AutoTrigEn.set(True)
-
-            time.sleep(200)
-
-            # stop triggering data
-            base.SystemRegs.AutoTrigEn.set(False)
-
-            print('Close data file')
-            base.dataWriter.open.set(False)
-
-    # acquire dark frames in 5 modes before the pulser scan
-
-    print('Disable ASICs test for darks')
-    for asicNo in range(16):
-        base.Epix10kaSaci[asicNo].test.set(False)
-        print('Disable ASICs atest for darks')
-        base.Epix10kaSaci[asicNo].atest.set(False)
-        print('Set ASICs to fixed medium')
-        base.Epix10kaSaci[asicNo].trbit.set(False)
-        base.Epix10kaSaci[asicNo].PrepareMultiConfig()
-        base.Epix10kaSaci[asicNo].WriteMatrixData(12)
-
-    print('Open dark file fixed medium')
-    base.dataWriter.dataFile.set(
-        args.dir +
-        '/calib_acq_width' +
-        '{:06d}'.format(
-            args.acqWidth) +
-        '_trbit' +
-        '{:1d}'.format(trbit) +
-        '_darkFixedMed.dat')
-    base.dataWriter.open.set(True)
-    # eanble automatic readout
-    base.SystemRegs.AutoTrigEn.set(True)
-    time.sleep(40)
-    # stop triggering data
-    base.SystemRegs.AutoTrigEn.set(False)
-    print('Close data file')
-    base.dataWriter.open.set(False)
-
-    for asicNo in range(16):
-        print('Set ASICs to fixed high')
-        base.Epix10kaSaci[asicNo].trbit.set(True)
-        base.Epix10kaSaci[asicNo].PrepareMultiConfig()
-        base.Epix10kaSaci[asicNo].WriteMatrixData(12)
-
-    print('Open dark file fixed high')
-    base.dataWriter.dataFile.set(
-        args.dir +
-        '/calib_acq_width' +
-        '{:06d}'.format(
-            args.acqWidth) +
-        '_trbit' +
-        '{:1d}'.format(trbit) +
-        '_darkFixedHigh.dat')
-    base.dataWriter.open.set(True)
-    # eanble automatic readout
-    base.SystemRegs.AutoTrigEn.set(True)
-    time.sleep(40)
-    # stop triggering data
-    base.SystemRegs.AutoTrigEn.set(False)
-    print('Close data file')
-    base.dataWriter.open.set(False)
-
-    for asicNo in range(16):
-        print('Set ASICs to fixed low')
-        base.Epix10kaSaci[asicNo].PrepareMultiConfig()
-        base.Epix10kaSaci[asicNo].WriteMatrixData(8)
-
-    print('Open dark file fixed low')
-    base.dataWriter.dataFile.set(
-        args.dir +
-        '/calib_acq_width' +
-        '{:06d}'.format(
-            args.acqWidth) +
-        '_trbit' +
-        '{:1d}'.format(trbit) +
-        '_darkFixedLow.dat')
-    base.dataWriter.open.set(True)
-    # eanble automatic readout
-    base.SystemRegs.AutoTrigEn.set(True)
-    time.sleep(40)
-    # stop triggering data
-    base.SystemRegs.AutoTrigEn.set(False)
-    print('Close data file')
-    base.dataWriter.open.set(False)
-
-    for asicNo in range(16):
-        print('Set ASICs to auto range high to low')
-        base.Epix10kaSaci[asicNo].trbit.set(True)
-        base.Epix10kaSaci[asicNo].PrepareMultiConfig()
-        base.Epix10kaSaci[asicNo].WriteMatrixData(0)
-
-    print('Open dark file auto range high to low')
-    base.dataWriter.dataFile.set(
-        args.dir +
-        '/calib_acq_width' +
-        '{:06d}'.format(
-            args.acqWidth) +
-        '_trbit' +
-        '{:1d}'.format(trbit) +
-        '_darkAutoHtoL.dat')
-    base.dataWriter.open.set(True)
-    # eanble automatic readout
-    base.SystemRegs.AutoTrigEn.set(True)
-    time.sleep(40)
-    # stop triggering data
-    base.SystemRegs.AutoTrigEn.set(False)
-    print('Close data file')
-    base.dataWriter.open.set(False)
-
-    for asicNo in range(16):
-        print('Set ASICs to auto range medium to low')
-        base.Epix10kaSaci[asicNo].trbit.set(False)
-        base.Epix10kaSaci[asicNo].PrepareMultiConfig()
-        base.Epix10kaSaci[asicNo].WriteMatrixData(0)
-
-    print('Open dark file auto range medium to low')
-    base.dataWriter.dataFile.set(
-        args.dir +
-        '/calib_acq_width' +
-        '{:06d}'.format(
-            args.acqWidth) +
-        '_trbit' +
-        '{:1d}'.format(trbit) +
-        '_darkAutoMtoL.dat')
-    base.dataWriter.open.set(True)
-    # eanble automatic readout
-    base.SystemRegs.AutoTrigEn.set(True)
-    time.sleep(40)
-    # stop triggering data
-    base.SystemRegs.AutoTrigEn.set(False)
-    print('Close data file')
-    base.dataWriter.open.set(False)
+            steps.append({
+                'name': 'trbit%d_22%d%d' % (trbit, x, y),
+                'frames': args.framesPerThreshold,
+                'asic': [
+                    ('test', True),
+                    ('atest', True),
+                    ('trbit', bool(trbit)),
+                    quad.matrixClear,
+                    lambda x=x, y=y: quad.matrixGrid(2, x, y, 1),
+                    ('PulserR', True),
+                    ('PulserR', False),
+                ],
+                'metadata': {'trbit': trbit, 'pattern': '22%d%d' % (x, y)},
+            })
+
+    # acquire dark frames in 5 modes after the pulser scan
+    darks = [
+        ('darkFixedMed', False, 12),
+        ('darkFixedHigh', True, 12),
+        ('darkFixedLow', True, 8),
+        ('darkAutoHtoL', True, 0),
+        ('darkAutoMtoL', False, 0),
+    ]
+    for name, darkTrbit, pixel in darks:
+        steps.append({
+            'name': 'trbit%d_%s' % (trbit, name),
+            'frames': args.framesPerDark,
+            'asic': [
+                ('test', False),
+                ('atest', False),
+                ('trbit', darkTrbit),
+                *quad.matrixFill(pixel),
+            ],
+            'metadata': {'trbit': trbit, 'dark': name},
+        })
+
+def report(entry):
+    print('Step %d %s: %d frames received, %d written in %.1f s' % (
+        entry['step'], entry['name'], entry['received'], entry.get('written', -1), entry['stopTime'] - entry['startTime']))
+
+dataFile = args.dir + '/calib_acq_width' + '{:06d}'.format(args.acqWidth) + '.dat'
+print('Writing %d steps to %s' % (len(steps), dataFile))
+
+engine = quad.ScanEngine(base)
+engine.run(steps, dataFile=dataFile, callback=report)
+
+base.stop()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+##############################################################################
+# This file is part of 'EPIX'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+# https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'EPIX', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+##############################################################################
+# End-to-end DAQ throughput benchmark against the simulation backend.
+# A local stream server stands in for the camera on localhost:10000 (VC0),
+# Top(hwType='simulation') connects to it and the frames are measured after
+# the file writer, the stream repeater and a viewer-like reader.
+##############################################################################
+import setupLibPaths
+
+import argparse
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pyrogue as pr
+import rogue
+import rogue.interfaces.stream as ris
+import ePixQuad as quad
+from ePixViewer.frameGenerator import QuadFrameGenerator
+
+# Header (8 words) + 712 x 768 pixels + 76 byte environmental footer
+QUAD_FRAME_SIZE = QuadFrameGenerator.headerSize + 712 * 768 * 2 + QuadFrameGenerator.footerSize
+
+# Offset of the float64 send timestamp, in the header words not used by the benchmark
+TIMESTAMP_OFFSET = 16
+
+
+class FrameSource(ris.Master):
+    """Sends synthetic frames at a fixed rate, stamping each one with its send time"""
+
+    def __init__(self, size, rate):
+        super().__init__()
+        self._size = size
+        self._period = 1.0 / rate if rate > 0 else 0.0
+        if size == QUAD_FRAME_SIZE:
+            # byte exact scrambled quad frame
+            self._payload = bytearray(QuadFrameGenerator(noise=3.0, seed=0).generate(1)[0].tobytes())
+        else:
+            self._payload = bytearray(np.random.default_rng(0).integers(0, 0x3FFF, size // 2, dtype=np.uint16).tobytes())
+            self._payload += bytearray(size - len(self._payload))
+        self.sent = 0
+
+    def sendOne(self, seq):
+        # header word 0 carries VC0, word 1 the acquisition number and word 2 the sequence count
+        struct.pack_into('<III', self._payload, 0, 0, seq, seq)
+        struct.pack_into('<d', self._payload, TIMESTAMP_OFFSET, time.perf_counter())
+        frame = self._reqFrame(self._size, True)
+        frame.write(self._payload, 0)
+        self._sendFrame(frame)
+        self.sent += 1
+
+    def run(self, duration):
+        start = time.perf_counter()
+        deadline = start
+        seq = 0
+        while time.perf_counter() - start < duration:
+            self.sendOne(seq)
+            seq += 1
+            if self._period > 0:
+                deadline += self._period
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class LatencyProbe(ris.Slave):
+    """Counts frames and records the latency from the timestamp embedded by FrameSource"""
+
+    def __init__(self):
+        super().__init__()
+        self._stamp = bytearray(8)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.frames = 0
+            self.bytes = 0
+            self.latency = []
+
+    def _acceptFrame(self, frame):
+        now = time.perf_counter()
+        with frame.lock():
+            size = frame.getPayload()
+            if size < TIMESTAMP_OFFSET + 8:
+                return
+            frame.read(self._stamp, TIMESTAMP_OFFSET)
+        with self._lock:
+            self.frames += 1
+            self.bytes += size
+            self.latency.append(now - struct.unpack('<d', self._stamp)[0])
+
+    def summary(self, elapsed):
+        with self._lock:
+            lat = np.array(self.latency) * 1e6
+            res = {
+                'frames': self.frames,
+                'fps': round(self.frames / elapsed, 2),
+                'MBps': round(self.bytes / elapsed * 1e-6, 3),
+            }
+        if len(lat) > 0:
+            p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+            res['latencyUs'] = {
+                'p50': round(float(p50), 1),
+                'p90': round(float(p90), 1),
+                'p99': round(float(p99), 1),
+                'max': round(float(lat.max()), 1),
+            }
+        return res
+
+
+#################################################################
+
+# Set the argument parser
+parser = argparse.ArgumentParser()
+
+# Convert str to bool
+def argBool(s):
+    return s.lower() in ['true', 't', 'yes', '1']
+
+# Add arguments
+parser.add_argument(
+    "--rate",
+    type=float,
+    required=False,
+    default=120.0,
+    help="Frame rate in Hz, 0 to send as fast as possible",
+)
+
+parser.add_argument(
+    "--size",
+    type=int,
+    required=False,
+    default=QUAD_FRAME_SIZE,
+    help="Frame size in bytes",
+)
+
+parser.add_argument(
+    "--duration",
+    type=float,
+    required=False,
+    default=10.0,
+    help="Measurement time in seconds",
+)
+
+parser.add_argument(
+    "--writer",
+    type=argBool,
+    required=False,
+    default=True,
+    help="Write the frames to a temporary file",
+)
+
+parser.add_argument(
+    "--fifoDepth",
+    type=int,
+    required=False,
+    default=100,
+    help="Writer FIFO depth",
+)
+
+parser.add_argument(
+    "--repeaterDepth",
+    type=int,
+    required=False,
+    default=0,
+    help="Stream repeater queue depth, 0 forwards inline",
+)
+
+parser.add_argument(
+    "--output",
+    type=str,
+    required=False,
+    default=None,
+    help="Write the JSON result to this file",
+)
+
+# Get the arguments
+args = parser.parse_args()
+
+#################################################################
+
+# Stand-in camera stream on the port Top(hwType='simulation') connects VC0 to
+server = rogue.interfaces.stream.TcpServer('127.0.0.1', 10000)
+source = FrameSource(args.size, args.rate)
+source >> server
+
+root = quad.Top(
+    hwType='simulation',
+    enVcMask=0x1,
+    enPrbs=False,
+    enWriter=args.writer,
+    enDevMask=quad.DEV_CORE,
+    fifoDepth=args.fifoDepth,
+    repeaterQueueDepth=args.repeaterDepth,
+    pollEn=False,
+    initRead=False,
+)
+
+viewerProbe = LatencyProbe()
+repeaterProbe = LatencyProbe()
+root.pgpVc0 >> viewerProbe
+root.repeater >> repeaterProbe
+
+result = {'config': vars(args)}
+
+with root:
+    dataFile = None
+    if args.writer:
+        fd, dataFile = tempfile.mkstemp(suffix='.dat')
+        os.close(fd)
+        root.dataWriter.DataFile.set(dataFile)
+        root.dataWriter.Open()
+
+    # Wait for the client to connect before measuring
+    seq = 0
+    timeout = time.perf_counter() + 10.0
+    while viewerProbe.frames == 0:
+        if time.perf_counter() > timeout:
+            raise TimeoutError('No frame received from the stand-in server')
+        source.sendOne(seq)
+        seq += 1
+        time.sleep(0.1)
+    time.sleep(0.5)
+
+    viewerProbe.reset()
+    repeaterProbe.reset()
+    root.countReset()
+    source.sent = 0
+
+    start = time.perf_counter()
+    source.run(args.duration)
+
+    # Let the queues drain
+    drainTimeout = time.perf_counter() + 5.0
+    while viewerProbe.frames < source.sent and time.perf_counter() < drainTimeout:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    result['sent'] = source.sent
+    result['elapsedSec'] = round(elapsed, 3)
+    result['viewerReader'] = viewerProbe.summary(elapsed)
+    result['repeater'] = repeaterProbe.summary(elapsed)
+    result['repeater']['dropCount'] = root.repeater.DropCount.get()
+    result['repeater']['queueHighWater'] = root.repeater.QueueHighWater.get()
+
+    if args.writer:
+        fifo = root.StreamFifoVc0
+        root.dataWriter.Close()
+        result['writer'] = {
+            'frames': root.dataWriter.FrameCount.get(),
+            'bytes': os.path.getsize(dataFile),
+            'MBps': round(os.path.getsize(dataFile) / elapsed * 1e-6, 3),
+            'fifoDropCount': fifo.DropCount.get(),
+            'fifoHighWater': fifo.QueueHighWater.get(),
+            'fifoHighWaterBytes': fifo.QueueHighWaterBytes.get(),
+        }
+        os.remove(dataFile)
+
+    result['drops'] = source.sent - result['viewerReader']['frames']
+
+print(json.dumps(result, indent=2))
+
+if args.output is not None:
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+##############################################################################
+# This file is part of 'EPIX'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+# https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'EPIX', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+##############################################################################
+# Times the register level procedures of Top against the in-process
+# register emulator (hwType='emulation'), no board or external simulation
+# is needed. The ADC training file is written to a temporary directory.
+##############################################################################
+import setupLibPaths
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import pyrogue as pr
+import ePixQuad as quad
+
+#################################################################
+
+# Set the argument parser
+parser = argparse.ArgumentParser()
+
+# Convert str to bool
+def argBool(s):
+    return s.lower() in ['true', 't', 'yes', '1']
+
+# Add arguments
+parser.add_argument(
+    "--latency",
+    type=float,
+    required=False,
+    default=0.0,
+    help="Emulated register round trip latency in seconds",
+)
+
+parser.add_argument(
+    "--confTime",
+    type=float,
+    required=False,
+    default=0.0,
+    help="Emulated SACI matrix configuration time in seconds",
+)
+
+parser.add_argument(
+    "--seed",
+    type=int,
+    required=False,
+    default=0,
+    help="Seed of the emulated ADC eyes",
+)
+
+parser.add_argument(
+    "--posted",
+    type=argBool,
+    required=False,
+    default=True,
+    help="Issue the command register writes as posted transactions",
+)
+
+parser.add_argument(
+    "--asicWorkers",
+    type=int,
+    required=False,
+    default=16,
+    help="ASICs configured concurrently by the matrix commands",
+)
+
+parser.add_argument(
+    "--steps",
+    type=str,
+    nargs='+',
+    required=False,
+    default=['AdcTrain', 'AdcStartup', 'SetAsicsMatrix', 'SetAsicMatrixTest', 'ClearAsicMatrix'],
+    help="Procedures to time, in order",
+)
+
+# Get the arguments
+args = parser.parse_args()
+
+#################################################################
+
+root = quad.Top(
+    hwType='emulation',
+    enVcMask=0x1,
+    enPrbs=False,
+    enWriter=False,
+    enDevMask=quad.DEV_CORE | quad.DEV_ASIC | quad.DEV_ADC,
+    pollEn=False,
+    initRead=False,
+)
+
+root.emulator.latency = args.latency
+root.emulator.confTime = args.confTime
+root.emulator.randomizeEyes(seed=args.seed)
+root.postedWrites = args.posted
+root.asicWorkers = args.asicWorkers
+
+def setAsicsMatrix():
+    root.SaciConfigCore.enable.set(True)
+    root.SaciConfigCore.SetAsicsMatrix(json.dumps([0] * 192))
+
+def enableAsics():
+    for i in range(16):
+        root.Epix10kaSaci[i].enable.set(True)
+
+def setAsicMatrixTest():
+    enableAsics()
+    root.SetAsicMatrixTest()
+
+def clearAsicMatrix():
+    enableAsics()
+    root.ClearAsicMatrix()
+
+steps = {
+    'AdcTrain': lambda: root.AdcTrain(),
+    'AdcStartup': lambda: root.AdcStartup(),
+    'SetAsicsMatrix': setAsicsMatrix,
+    'SetAsicMatrixTest': setAsicMatrixTest,
+    'ClearAsicMatrix': clearAsicMatrix,
+}
+
+result = {'config': vars(args), 'steps': {}}
+
+workDir = tempfile.mkdtemp()
+cwd = os.getcwd()
+os.chdir(workDir)
+
+with root:
+    for name in args.steps:
+        # the procedures report their progress on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            steps[name]()
+            dt = time.perf_counter() - t0
+        result['steps'][name] = {'sec': round(dt, 4)}
+
+    # distance of the trained delays to the emulated eye centers
+    if 'AdcTrain' in args.steps:
+        error = [abs(root.allDelays[i] - root.emulator.eyeCenter.flat[i]) for i in range(len(root.allDelays))]
+        result['trainingErrorMax'] = round(max(error), 1)
+
+os.chdir(cwd)
+
+print(json.dumps(result, indent=2))
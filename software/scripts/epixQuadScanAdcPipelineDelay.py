@@ -22,59 +22,6 @@ from time import gmtime, strftime
 import numpy as np
 
 
-class EventReader(rogue.interfaces.stream.Slave):
-    """retrieves data from a file using rogue utilities services"""
-
-    def __init__(self, parent):
-        rogue.interfaces.stream.Slave.__init__(self)
-        super(EventReader, self).__init__()
-        self.enable = True
-        self.lastFrame = rogue.interfaces.stream.Frame
-
-        self._superRowSize = int(768 / 2)
-        self._NumColPerAdcCh = int(96 / 2)
-        self._superRowSizeInBytes = self._superRowSize * 4
-        self.sensorHeight = 712
-
-        #self.average = 10
-        self.reqFrames = 0
-        self.accFrames = 0
-        self.pixelSum = 0
-        self.pixelAvg = 0
-        self.rmsData = []
-        self.rms = 0
-
-    def _acceptFrame(self, frame):
-
-        self.lastFrame = frame
-        # reads entire frame
-        p = bytearray(self.lastFrame.getPayload())
-        self.lastFrame.read(p, 0)
-
-        VcNum = p[0] & 0xF
-
-        headerBytes = 8 * 4
-        pixelOffset = headerBytes + self._superRowSizeInBytes * 3 * 4 + int(self._superRowSizeInBytes / 2)
-
-        # print(pixelOffset)
-
-        if (VcNum == 0 and self.accFrames < self.reqFrames):
-            pixel = (((p[pixelOffset + 7] << 8) | p[pixelOffset + 6]) & 0x3FFF)
-            self.pixelSum = self.pixelSum + pixel
-            if self.accFrames == 0:
-                self.rmsData = []
-            self.rmsData.append(pixel)
-            if self.accFrames == self.reqFrames - 1:
-                self.rms = np.sqrt(np.mean((self.rmsData - np.mean(self.rmsData))**2))
-            self.accFrames = self.accFrames + 1
-            if (PRINT_VERBOSE):
-                for i in range(10):
-                    print('%d' % (((p[pixelOffset + i * 2 + 1] << 8) | p[pixelOffset + i * 2]) & 0x3FFF))
-
-
-PRINT_VERBOSE = 0
-
-
 #################################################################
 
 # Set the argument parser
@@ -111,6 +58,30 @@ parser.add_argument(
     help="PGP devide (default /dev/datadev_0)",
 )
 
+parser.add_argument(
+    "--frames",
+    type=int,
+    required=False,
+    default=50,
+    help="Frames averaged per delay",
+)
+
+parser.add_argument(
+    "--coarseStep",
+    type=int,
+    required=False,
+    default=8,
+    help="Coarse scan step, the best delays are then refined with step 1 (1 scans every delay)",
+)
+
+parser.add_argument(
+    "--output",
+    type=str,
+    required=False,
+    default=None,
+    help="Write the per bank scan results to this csv file",
+)
+
 # Get the arguments
 args = parser.parse_args()
 
@@ -118,9 +89,8 @@ args = parser.parse_args()
 
 # Set base
 QuadTop = quad.Top(hwType='datadev', dev=args.pgp)
-eventReader = EventReader(QuadTop)
-eventReader << QuadTop.pgpVc0
-#pyrogue.streamTap(QuadTop.pgpVc0, eventReader)
+bankStats = quad.BankStatistics()
+bankStats << QuadTop.pgpVc0
 
 # Start the system
 QuadTop.start()
@@ -129,7 +99,8 @@ QuadTop.start()
 QuadTop.SystemRegs.enable.set(True)
 QuadTop.RdoutCore.enable.set(True)
 QuadTop.AcqCore.enable.set(True)
-QuadTop.Epix10kaSaci[13].enable.set(True)
+for i in range(16):
+    QuadTop.Epix10kaSaci[i].enable.set(True)
 
 # check ADC startup
 if (QuadTop.SystemRegs.AdcTestFailed.get() == True):
@@ -140,16 +111,20 @@ if (QuadTop.SystemRegs.AdcTestFailed.get() == True):
 # stop if running
 QuadTop.SystemRegs.TrigEn.set(False)
 
-# set one pixel in High Gain and Test mode
-QuadTop.Epix10kaSaci[13].ClearMatrix()
-QuadTop.Epix10kaSaci[13].RowCounter(3)
-QuadTop.Epix10kaSaci[13].ColCounter(3)
-QuadTop.Epix10kaSaci[13].WritePixelData(0xD)
-
-# pulse one pixel
-QuadTop.Epix10kaSaci[13].Pulser.set(0x1)
-QuadTop.Epix10kaSaci[13].hrtest.set(True)
-QuadTop.Epix10kaSaci[13].test.set(True)
+# set the pulsed region of every bank in High Gain and Test mode
+def setPulsedRegion(i, asic):
+    with QuadTop.writeBatch() as batch:
+        for x in range(20, 24):
+            for y in range(5, 8):
+                batch.set(asic.RowCounter, x)
+                batch.set(asic.ColCounter, y)
+                batch.set(asic.WritePixelData, 0xD)
+        batch.set(asic.Pulser, 0x1)
+        batch.set(asic.hrtest, True)
+        batch.set(asic.test, True)
+
+QuadTop.ClearAsicMatrix()
+QuadTop.forEachAsic(setPulsedRegion)
 
 # set autotrigger
 QuadTop.SystemRegs.TrigEn.set(True)
@@ -157,30 +132,36 @@ QuadTop.SystemRegs.AutoTrigEn.set(False)  # stop and reset auto trigger counter
 QuadTop.SystemRegs.AutoTrigPer.set(2000000)  # 20ms = 50Hz
 QuadTop.SystemRegs.TrigSrcSel.set(0x3)
 
-# request 10 frames for average
-eventReader.reqFrames = 50
-
 QuadTop.RdoutCore.RdoutEn.set(True)
-adcPipDly = QuadTop.RdoutCore.AdcPipelineDelay.get()
+adcPipDly = QuadTop.RdoutCore.AdcPipelineDelay.get() & 0xFF
 
 print(
     'AsicRoClkHalfT is set to %d. AdcPipelineDelay should be re-adjusted for different AsicRoClkHalfT settings' %
      (QuadTop.AcqCore.AsicRoClkHalfT.get()))
-print('AdcPipelineDelay, PixelAvg, PixelRMS')
-# look for pulsed pixel (maximum)
-for i in range(256):
-    QuadTop.RdoutCore.AdcPipelineDelay.set(0xAAAA0000 | i)
-    QuadTop.SystemRegs.AutoTrigEn.set(True)   # start auto trigger counter
-    while(eventReader.accFrames < eventReader.reqFrames):
-        pass
-    QuadTop.SystemRegs.AutoTrigEn.set(False)  # stop and reset auto trigger counter
-    print('%d, %f, %f' % (i, eventReader.pixelSum / eventReader.reqFrames, eventReader.rms))
-    if (PRINT_VERBOSE):
-        print(eventReader.rmsData)
-    eventReader.pixelSum = 0
-    eventReader.accFrames = 0
-
-QuadTop.RdoutCore.AdcPipelineDelay.set(0xAAAA0000 | adcPipDly)
+print('AdcPipelineDelay, min/median/max bank signal, max bank RMS')
+
+def report(delay, mean, rms):
+    print('%d, %f, %f, %f, %f' % (delay, np.nanmin(mean), np.nanmedian(mean), np.nanmax(mean), np.nanmax(rms)))
+
+# look for the pulsed region (maximum) of all banks in one scan
+scan = quad.PipelineDelayScan(QuadTop, bankStats, numFrames=args.frames, coarseStep=args.coarseStep)
+t0 = time.perf_counter()
+try:
+    best = scan.run(callback=report)
+finally:
+    QuadTop.SystemRegs.AutoTrigEn.set(False)
+    QuadTop.RdoutCore.AdcPipelineDelay.set(0xAAAA0000 | adcPipDly)
+
+print('Scanned %d delays in %.1f s' % (len(scan.results), time.perf_counter() - t0))
+print('Best AdcPipelineDelay per bank (ASIC row major, 16 banks per row):')
+print(best.reshape(4, 16))
+print('Median best AdcPipelineDelay: %d' % int(np.median(best)))
+
+if args.output is not None:
+    delays = sorted(scan.results)
+    table = np.array([np.concatenate(([d], *scan.results[d])) for d in delays])
+    cols = ['delay'] + ['mean%d' % b for b in range(len(best))] + ['rms%d' % b for b in range(len(best))]
+    np.savetxt(args.output, table, delimiter=',', header=','.join(cols), comments='')
 
 QuadTop.stop()
 exit()
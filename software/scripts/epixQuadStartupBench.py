@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+##############################################################################
+# This file is part of 'EPIX'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+# https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'EPIX', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+##############################################################################
+# Measures the time needed to import, build and start the ePixQuad Top for
+# a given subsystem mask (see ePixQuad.Top DEV_* constants)
+##############################################################################
+import setupLibPaths
+
+import time
+t0 = time.perf_counter()
+
+import argparse
+import json
+import pyrogue as pr
+import ePixQuad as quad
+
+tImport = time.perf_counter() - t0
+
+#################################################################
+
+# Set the argument parser
+parser = argparse.ArgumentParser()
+
+# Convert str to bool
+def argBool(s):
+    return s.lower() in ['true', 't', 'yes', '1']
+
+profiles = {
+    'data': quad.DEV_CORE,
+    'asic': quad.DEV_CORE | quad.DEV_ASIC,
+    'adc': quad.DEV_CORE | quad.DEV_ADC,
+    'full': quad.DEV_ALL,
+}
+
+# Add arguments
+parser.add_argument(
+    "--profile",
+    type=str,
+    required=False,
+    default='data',
+    help="Startup profile: %s" % ', '.join(profiles),
+)
+
+parser.add_argument(
+    "--type",
+    type=str,
+    required=False,
+    default='simulation',
+    help="Data card type datadev, simulation or emulation",
+)
+
+parser.add_argument(
+    "--dev",
+    type=str,
+    required=False,
+    default='/dev/datadev_0',
+    help="Data card device",
+)
+
+parser.add_argument(
+    "--l",
+    type=int,
+    required=False,
+    default=0,
+    help="PGP lane number [0 ~ 3]",
+)
+
+parser.add_argument(
+    "--enVcMask",
+    type=lambda s: int(s, 0),
+    required=False,
+    default=0xf,
+    help="Enabled virtual channels",
+)
+
+parser.add_argument(
+    "--start",
+    type=argBool,
+    required=False,
+    default=True,
+    help="Include Root.start()/stop() in the measurement",
+)
+
+# Get the arguments
+args = parser.parse_args()
+
+#################################################################
+
+t0 = time.perf_counter()
+root = quad.Top(
+    hwType=args.type,
+    dev=args.dev,
+    lane=args.l,
+    enVcMask=args.enVcMask,
+    enDevMask=profiles[args.profile],
+    pollEn=False,
+    initRead=False,
+)
+tBuild = time.perf_counter() - t0
+
+tStart = 0.0
+tStop = 0.0
+if args.start:
+    t0 = time.perf_counter()
+    root.start()
+    tStart = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    root.stop()
+    tStop = time.perf_counter() - t0
+
+numVars = len(root.variableList)
+
+print(json.dumps({
+    'profile': args.profile,
+    'enDevMask': profiles[args.profile],
+    'hwType': args.type,
+    'variables': numVars,
+    'importSec': round(tImport, 4),
+    'buildSec': round(tBuild, 4),
+    'startSec': round(tStart, 4),
+    'stopSec': round(tStop, 4),
+    'totalSec': round(tImport + tBuild + tStart, 4),
+}, indent=2))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+##############################################################################
+# This file is part of 'EPIX'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+# https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'EPIX', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+##############################################################################
+# Measures the import time of the ePixViewer modules, each one in a fresh
+# interpreter, and reports whether the import pulled in the GUI stack
+##############################################################################
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+top_level = os.path.realpath(__file__).split('software')[0]
+
+# Runs in the child interpreter, prints the elapsed time and the GUI modules loaded
+probe = '''
+import sys, time, json
+sys.path.insert(0, {path!r})
+t0 = time.perf_counter()
+{stmt}
+dt = time.perf_counter() - t0
+gui = sorted({{m.split('.')[0] for m in sys.modules if m.split('.')[0] in ('PyQt4', 'PyQt5', 'matplotlib', 'rogue', 'pyrogue')}})
+print(json.dumps({{'sec': dt, 'gui': gui}}))
+'''
+
+targets = {
+    'Cameras': 'import ePixViewer.Cameras',
+    'imgProcessing': 'import ePixViewer.imgProcessing',
+    'ePixViewer': 'import ePixViewer',
+    'pixelCalibration': 'import ePixViewer.pixelCalibration',
+    'Window': 'import ePixViewer; ePixViewer.Window',
+}
+
+#################################################################
+
+# Set the argument parser
+parser = argparse.ArgumentParser()
+
+parser.add_argument(
+    "--repeat",
+    type=int,
+    required=False,
+    default=5,
+    help="Number of fresh interpreters per target",
+)
+
+parser.add_argument(
+    "--targets",
+    type=str,
+    nargs='+',
+    required=False,
+    default=list(targets),
+    help="Targets to measure: %s" % ', '.join(targets),
+)
+
+# Get the arguments
+args = parser.parse_args()
+
+#################################################################
+
+results = {}
+for name in args.targets:
+    code = probe.format(path=top_level + 'software/python', stmt=targets[name])
+    times = []
+    gui = []
+    error = None
+    for i in range(args.repeat):
+        proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1]
+            break
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        times.append(res['sec'])
+        gui = res['gui']
+
+    if error is not None:
+        results[name] = {'error': error}
+    else:
+        times.sort()
+        results[name] = {
+            'minSec': round(times[0], 4),
+            'medianSec': round(times[len(times) // 2], 4),
+            'guiModules': gui,
+        }
+
+print(json.dumps(results, indent=2))
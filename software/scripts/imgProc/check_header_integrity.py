@@ -0,0 +1,94 @@
+# -----------------------------------------------------------------------------
+# Title      : check frame headers of data files
+# -----------------------------------------------------------------------------
+# File       : check_header_integrity.py
+# Created    : 2026-10-19
+# -----------------------------------------------------------------------------
+# Description:
+# Checks the frame sizes, writer errors, VC mix, sequence counter and
+# acquisition number of whole data files at once (see
+# ePixViewer.integrityCheck). Replaces the frame by frame loops of
+# check_header_image_from_file.py and check_header_image_from_file_cpix2.py.
+# Exits with 1 when a check fails.
+#
+# -----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+# -----------------------------------------------------------------------------
+
+import argparse
+import sys
+import time
+
+import ePixViewer.integrityCheck as integrityCheck
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument(
+    "filenames",
+    nargs='+',
+    help="Data files to check",
+)
+
+parser.add_argument(
+    "--camera",
+    type=str,
+    required=False,
+    default=None,
+    choices=sorted(integrityCheck.FRAME_SIZES),
+    help="Checks the frame size of this camera",
+)
+
+parser.add_argument(
+    "--frameSize",
+    type=int,
+    required=False,
+    default=None,
+    help="Expected frame payload size in bytes, overrides --camera",
+)
+
+parser.add_argument(
+    "--channel",
+    type=int,
+    required=False,
+    default=None,
+    help="Writer channel of the frames (1 for VC0 data), default every record",
+)
+
+parser.add_argument(
+    "--vc",
+    type=int,
+    required=False,
+    default=0,
+    help="Header VC of the sequence and acqNum checks, -1 for every frame",
+)
+
+parser.add_argument(
+    "--maxList",
+    type=int,
+    required=False,
+    default=10,
+    help="Frame numbers listed per failed check",
+)
+
+args = parser.parse_args()
+
+frameSize = args.frameSize
+if frameSize is None and args.camera is not None:
+    frameSize = integrityCheck.FRAME_SIZES[args.camera]
+
+failed = False
+for filename in args.filenames:
+    start = time.time()
+    report = integrityCheck.checkDatFile(filename, frameSize=frameSize, channel=args.channel,
+                                         vc=None if args.vc < 0 else args.vc)
+    print(report.summary(args.maxList))
+    print('  checked in %.2f s' % (time.time() - start))
+    failed |= not report.ok
+
+sys.exit(1 if failed else 0)